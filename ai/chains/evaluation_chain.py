@@ -1,5 +1,3 @@
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
 from pathlib import Path
 from typing import Dict, Any, List
 import json
@@ -41,6 +39,9 @@ def create_evaluation_chain(
     Returns:
         Evaluation results as a dictionary
     """
+    from langchain.chains import LLMChain
+    from langchain.prompts import PromptTemplate
+
     # Load the evaluation prompt
     base_prompt = load_evaluation_prompt_template()
 
@@ -66,7 +67,19 @@ Key Symptoms: {case_data.get('symptoms', 'Unknown')}
     # Run evaluation
     result = chain.run(case_summary=case_summary, transcript=transcript)
 
-    # Parse the JSON result
+    return parse_evaluation_result(result)
+
+
+def parse_evaluation_result(result: str) -> Dict[str, Any]:
+    """
+    Parse the evaluator's reply into a dictionary.
+
+    Args:
+        result: Raw LLM output, optionally wrapped in a ```json fence
+
+    Returns:
+        Evaluation results, or an error structure if the JSON is invalid
+    """
     try:
         # Try to extract JSON from the result
         result = result.strip()
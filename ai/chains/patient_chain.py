@@ -1,6 +1,3 @@
-from langchain.chains import ConversationChain
-from langchain.prompts import PromptTemplate
-from langchain.memory import ConversationBufferMemory
 from pathlib import Path
 from typing import Dict, Any
 
@@ -12,20 +9,21 @@ def load_patient_prompt_template() -> str:
         return f.read()
 
 
-def create_patient_chain(
-    llm, memory: ConversationBufferMemory, case_data: Dict[str, Any]
-):
+def create_patient_prompt(case_data: Dict[str, Any]):
     """
-    Create a LangChain ConversationChain for patient simulation.
+    Create the patient prompt template for a case.
+
+    The persona is rendered once, so one template can be shared by every
+    session of the case.
 
     Args:
-        llm: Language model instance
-        memory: Conversation memory
         case_data: Dictionary containing patient case information
 
     Returns:
-        ConversationChain configured for patient simulation
+        PromptTemplate with chat_history and input variables
     """
+    from langchain.prompts import PromptTemplate
+
     # Load and format the patient prompt
     base_prompt = load_patient_prompt_template()
 
@@ -41,14 +39,8 @@ def create_patient_chain(
         medical_history=case_data.get("medical_history", ""),
     )
 
-    # Create the prompt template
-    prompt = PromptTemplate(
+    return PromptTemplate(
         input_variables=["chat_history", "input"],
         template=formatted_system_prompt
         + "\n\nConversation History:\n{chat_history}\n\nStudent: {input}\nPatient:",
     )
-
-    # Create and return the conversation chain
-    chain = ConversationChain(llm=llm, memory=memory, prompt=prompt, verbose=False)
-
-    return chain
@@ -1,40 +1,193 @@
-from langchain.memory import ConversationBufferMemory
-from typing import Dict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import itertools
+import sys
+import threading
+import time
+
+# Roles are stored as interned strings so every message shares one object
+HUMAN = sys.intern("human")
+AI = sys.intern("ai")
+
+# Wire-format roles for stored message roles
+WIRE_ROLES = {HUMAN: "user", AI: "assistant"}
+
+
+class MessageRecord:
+    """One stored chat message."""
+
+    __slots__ = ("role", "content")
+
+    def __init__(self, role: str, content: str):
+        self.role = role
+        self.content = content
+
+
+class SessionMemory:
+    """Compact conversation history of one session."""
+
+    __slots__ = ("messages", "epoch", "last_active")
+
+    def __init__(self, epoch: int, last_active: Optional[float] = None):
+        self.messages: List[MessageRecord] = []
+        # Changes whenever the history is created or reset, so an
+        # (epoch, turn count) pair identifies one exact history
+        self.epoch = epoch
+        # Wall-clock time of the last turn, used to drop idle sessions
+        self.last_active = time.time() if last_active is None else last_active
 
 
 class ConversationMemoryManager:
-    """Manages conversation memory for different sessions."""
+    """
+    Manages conversation memory for different sessions.
+
+    Histories are kept as slotted message records; LangChain message
+    objects are only built when a prompt is rendered.
+    """
+
+    def __init__(self, restore_wait: float = 5.0):
+        self._sessions: Dict[str, SessionMemory] = {}
+        self._next_epoch = itertools.count(1)
+        # Set whenever no restore is running; cleared while sessions stream in
+        self._restored = threading.Event()
+        self._restored.set()
+        self.restore_wait = restore_wait
 
-    def __init__(self):
-        self._sessions: Dict[str, ConversationBufferMemory] = {}
+    def _wait_for_restore(self, session_id: str) -> None:
+        """
+        Wait for a session that may still be streaming in from a snapshot.
 
-    def get_memory(self, session_id: str) -> ConversationBufferMemory:
+        This blocks, so only the chat turn path, which runs in the threadpool,
+        calls it; read-only lookups report unknown sessions as empty instead.
+        """
+        if session_id not in self._sessions and not self._restored.is_set():
+            self._restored.wait(self.restore_wait)
+
+    def get_memory(self, session_id: str) -> SessionMemory:
         """Get or create memory for a session."""
+        self._wait_for_restore(session_id)
         if session_id not in self._sessions:
-            self._sessions[session_id] = ConversationBufferMemory(
-                memory_key="chat_history",
-                return_messages=True,
-                input_key="input",
-                output_key="output",
-            )
+            self._sessions[session_id] = SessionMemory(next(self._next_epoch))
         return self._sessions[session_id]
 
+    def add_turn(self, session_id: str, message: str, response: str) -> None:
+        """Append a student message and the patient's reply to a session."""
+        memory = self.get_memory(session_id)
+        memory.messages.append(MessageRecord(HUMAN, message))
+        memory.messages.append(MessageRecord(AI, response))
+        memory.last_active = time.time()
+
     def clear_memory(self, session_id: str) -> None:
         """Clear memory for a session."""
         if session_id in self._sessions:
-            self._sessions[session_id].clear()
+            self._sessions[session_id] = SessionMemory(next(self._next_epoch))
 
     def delete_session(self, session_id: str) -> None:
         """Delete a session completely."""
         if session_id in self._sessions:
             del self._sessions[session_id]
 
+    def get_history_version(self, session_id: str) -> Tuple[int, int]:
+        """
+        Get a session's (epoch, turn count) without touching its messages.
+
+        Returns:
+            (0, 0) for unknown sessions
+        """
+        memory = self._sessions.get(session_id)
+        if memory is None:
+            return 0, 0
+        return memory.epoch, len(memory.messages) // 2
+
+    def get_history_page(
+        self, session_id: str, since_turn: int = 0, limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Get one page of a session's history in compact wire format.
+
+        A turn is one student message and the patient's reply, numbered
+        from 1; both messages of a turn carry the same number.
+
+        Args:
+            session_id: Session identifier
+            since_turn: Only return turns after this one
+            limit: Maximum number of turns to return
+
+        Returns:
+            Tuple of ([{role, content, turn}, ...], whether more turns follow)
+        """
+        memory = self._sessions.get(session_id)
+        if memory is None:
+            return [], False
+
+        messages = memory.messages
+        start = since_turn * 2
+        end = len(messages) if limit is None else min(len(messages), start + limit * 2)
+        page = [
+            {
+                "role": WIRE_ROLES[message.role],
+                "content": message.content,
+                "turn": index // 2 + 1,
+            }
+            for index, message in enumerate(messages[start:end], start)
+        ]
+        return page, end < len(messages)
+
     def get_chat_history(self, session_id: str) -> list:
-        """Get chat history for a session."""
+        """Get chat history for a session as LangChain messages, built on demand."""
+        from langchain.schema import AIMessage, HumanMessage
+
+        self._wait_for_restore(session_id)
+        memory = self._sessions.get(session_id)
+        if memory is None:
+            return []
+        return [
+            (
+                HumanMessage(content=message.content)
+                if message.role is HUMAN
+                else AIMessage(content=message.content)
+            )
+            for message in memory.messages
+        ]
+
+    def export_sessions(
+        self,
+    ) -> Iterator[Tuple[str, List[Dict[str, str]], float]]:
+        """Yield every session as (session_id, [{role, content}, ...], last_active)."""
+        for session_id, memory in list(self._sessions.items()):
+            messages = [
+                {"role": message.role, "content": message.content}
+                for message in memory.messages
+            ]
+            yield session_id, messages, memory.last_active
+
+    def restore_session(
+        self,
+        session_id: str,
+        messages: List[Dict[str, str]],
+        last_active: Optional[float] = None,
+    ) -> None:
+        """
+        Rebuild a session's memory from exported messages.
+
+        Sessions that already received traffic since startup are left alone,
+        since their live memory is newer than anything on disk.
+        """
         if session_id in self._sessions:
-            memory = self._sessions[session_id]
-            return memory.chat_memory.messages
-        return []
+            return
+        memory = SessionMemory(next(self._next_epoch), last_active)
+        memory.messages = [
+            MessageRecord(HUMAN if message["role"] == HUMAN else AI, message["content"])
+            for message in messages
+        ]
+        self._sessions[session_id] = memory
+
+    def begin_restore(self) -> None:
+        """Mark that sessions are being restored in the background."""
+        self._restored.clear()
+
+    def end_restore(self) -> None:
+        """Mark the background restore as finished."""
+        self._restored.set()
 
 
 # Global memory manager instance
@@ -0,0 +1,277 @@
+"""
+Admission control for the LLM-backed endpoints.
+
+Requests are first checked against per-client and per-session token
+buckets, then against a global cap on in-flight LLM calls with a bounded
+wait queue. Anything that cannot be admitted gets a fast 429 with a
+Retry-After header instead of piling up behind the OpenAI rate limit.
+
+Capacity is split by priority class: evaluations may only hold part of
+the in-flight slots and of the wait queue, and waiting chat turns are
+admitted before waiting evaluations, so an evaluation burst cannot crowd
+chat turns out.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+from backend.core.config import get_settings
+from backend.core.llm_scheduler import CHAT, EVALUATION, PRIORITY_CLASSES
+
+# Idle buckets are pruned once this many keys are tracked
+MAX_TRACKED_BUCKETS = 10000
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        """Add the tokens earned since the last update."""
+        # A bucket created after ``now`` was read has nothing to add yet
+        elapsed = max(0.0, now - self.updated)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = max(self.updated, now)
+
+    def try_acquire(self, now: float) -> float:
+        """
+        Take one token if available.
+
+        Returns:
+            0 if a token was taken, otherwise seconds until one is available
+        """
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+def too_many_requests(detail: str, retry_after: float) -> HTTPException:
+    """Build a 429 error with a Retry-After header in whole seconds."""
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionController:
+    """Rate limits and caps concurrent LLM calls across all clients."""
+
+    def __init__(
+        self,
+        max_in_flight: int = 32,
+        max_queue: int = 64,
+        queue_timeout: float = 10.0,
+        client_rate: float = 1.0,
+        client_burst: float = 20,
+        session_rate: float = 1 / 3,
+        session_burst: float = 5,
+        evaluation_max_share: float = 0.5,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        # Per class caps; chat turns may use all of the capacity
+        self.class_in_flight = {
+            CHAT: max_in_flight,
+            EVALUATION: max(1, int(max_in_flight * evaluation_max_share)),
+        }
+        self.class_queue = {
+            CHAT: max_queue,
+            EVALUATION: max(1, int(max_queue * evaluation_max_share)),
+        }
+        self.queue_timeout = queue_timeout
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._running = {cls: 0 for cls in PRIORITY_CLASSES}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {
+            cls: deque() for cls in PRIORITY_CLASSES
+        }
+        # Moving average of admitted call duration, for Retry-After estimates
+        self._avg_service_time = 1.0
+
+    def _bucket(self, key: str, rate: float, capacity: float) -> TokenBucket:
+        """Get or create the token bucket for a key."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_BUCKETS:
+                self._prune(time.monotonic())
+            bucket = self._buckets[key] = TokenBucket(rate, capacity)
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        """Forget buckets that have refilled completely."""
+        for key, bucket in list(self._buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity:
+                del self._buckets[key]
+
+    def check_rate(self, client_id: str, session_id: Optional[str] = None) -> None:
+        """Raise a 429 if the client or session is over its rate limit."""
+        now = time.monotonic()
+        wait = self._bucket(
+            f"client:{client_id}", self.client_rate, self.client_burst
+        ).try_acquire(now)
+        if wait:
+            raise too_many_requests("Too many requests from this client", wait)
+
+        if session_id is not None:
+            wait = self._bucket(
+                f"session:{session_id}", self.session_rate, self.session_burst
+            ).try_acquire(now)
+            if wait:
+                raise too_many_requests("Too many requests for this session", wait)
+
+    def _saturated_retry_after(self) -> float:
+        """Estimate how long until a queued request would be served."""
+        backlog = self.waiting + 1
+        return self._avg_service_time * backlog / self.max_in_flight
+
+    def _can_start(self, priority: str) -> bool:
+        """Whether a request of a class may take a slot right now."""
+        return (
+            self.in_flight < self.max_in_flight
+            and self._running[priority] < self.class_in_flight[priority]
+        )
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting requests, chat turns first."""
+        for priority in PRIORITY_CLASSES:
+            waiters = self._waiters[priority]
+            while waiters and self._can_start(priority):
+                future = waiters.popleft()
+                if future.done():
+                    # Timed out or cancelled while waiting
+                    continue
+                self._running[priority] += 1
+                future.set_result(None)
+
+    async def _acquire(self, priority: str) -> None:
+        """Take an in-flight slot for a class, waiting in its queue if needed."""
+        ahead = any(
+            self._waiters[cls]
+            for cls in PRIORITY_CLASSES[: PRIORITY_CLASSES.index(priority) + 1]
+        )
+        if not ahead and self._can_start(priority):
+            self._running[priority] += 1
+            return
+
+        waiters = self._waiters[priority]
+        if len(waiters) >= self.class_queue[priority]:
+            raise too_many_requests(
+                "Server is busy, please retry", self._saturated_retry_after()
+            )
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Granted a slot just as the wait ended
+                self._release(priority)
+            else:
+                future.cancel()
+                if future in waiters:
+                    waiters.remove(future)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise too_many_requests(
+                "Server is busy, please retry", self._saturated_retry_after()
+            )
+
+    def _release(self, priority: str) -> None:
+        """Free a slot and pass it on."""
+        self._running[priority] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: str = CHAT) -> AsyncIterator[None]:
+        """
+        Hold an in-flight slot for the duration of the block, without rate limits.
+
+        Raises:
+            HTTPException: 429 when the wait queue is full
+        """
+        await self._acquire(priority)
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(priority)
+            elapsed = time.monotonic() - start
+            self._avg_service_time = 0.9 * self._avg_service_time + 0.1 * elapsed
+
+    @asynccontextmanager
+    async def admit(
+        self, client_id: str, session_id: Optional[str] = None, priority: str = CHAT
+    ) -> AsyncIterator[None]:
+        """
+        Rate limit a request, then hold an in-flight slot for the block.
+
+        Args:
+            client_id: Calling client, see get_client_id
+            session_id: Session the request belongs to, if any
+            priority: CHAT or EVALUATION
+
+        Raises:
+            HTTPException: 429 when rate limited or the wait queue is full
+        """
+        self.check_rate(client_id, session_id)
+        async with self.slot(priority):
+            yield
+
+    @property
+    def in_flight(self) -> int:
+        """Number of admitted requests currently running."""
+        return sum(self._running.values())
+
+    @property
+    def waiting(self) -> int:
+        """Number of requests queued for a slot."""
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+
+def get_client_id(request: Request) -> str:
+    """Identify the calling client for rate limiting."""
+    settings = get_settings()
+    if settings.admission_trust_forwarded_for:
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+@lru_cache()
+def get_admission_controller() -> AdmissionController:
+    """Get the shared admission controller, configured from settings."""
+    settings = get_settings()
+    return AdmissionController(
+        max_in_flight=settings.admission_max_in_flight,
+        max_queue=settings.admission_max_queue,
+        queue_timeout=settings.admission_queue_timeout,
+        client_rate=settings.rate_limit_client_per_minute / 60,
+        client_burst=settings.rate_limit_client_burst,
+        session_rate=settings.rate_limit_session_per_minute / 60,
+        session_burst=settings.rate_limit_session_burst,
+        evaluation_max_share=settings.admission_evaluation_max_share,
+    )
@@ -0,0 +1,104 @@
+"""
+Negotiated response compression for large API payloads.
+
+Brotli is used when the client accepts it and the optional `brotli`
+package is installed, otherwise gzip. Small responses are sent as-is,
+since compressing them costs more CPU than it saves on the wire.
+"""
+
+import gzip
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(coding.strip())
+
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing single-body responses above a size threshold."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+
+            # Streaming, tiny or already-encoded responses go out untouched
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            body = self.compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """Compress a response body with the negotiated encoding."""
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
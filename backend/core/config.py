@@ -6,15 +6,84 @@ class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
 
     # OpenAI Configuration
-    openai_api_key: str
+    # Only needed once an LLM call is made, so the app can start offline
+    openai_api_key: str = ""
     openai_model: str = "gpt-4"
     openai_temperature: float = 0.7
 
+    # Per-role models; empty means openai_model
+    patient_model: str = ""
+    evaluator_model: str = ""
+    # Patient model by case difficulty, e.g. {"easy": "gpt-3.5-turbo"}
+    patient_model_by_difficulty: dict = {}
+
+    # Hedged chat turns: a faster backup model is tried when the patient
+    # model is slower than its recent p95 to a first token (empty disables)
+    chat_hedge_model: str = ""
+    chat_hedge_quantile: float = 0.95
+    chat_hedge_initial_delay_ms: int = 2000
+    chat_hedge_min_delay_ms: int = 200
+
     # FastAPI Configuration
     app_name: str = "VSP Chatbot API"
     debug: bool = False
     cors_origins: list = ["http://localhost:3000", "http://127.0.0.1:3000"]
 
+    # Responses smaller than this many bytes are sent uncompressed
+    compression_minimum_size: int = 1024
+
+    # Session log (empty dir means backend/data/sessions)
+    session_log_dir: str = ""
+    session_log_commit_interval_ms: int = 50
+    session_log_compress: bool = True
+
+    # Live session snapshot for warm restarts (empty means inside the log dir)
+    session_snapshot_path: str = ""
+    # Sessions idle this long are ended instead of snapshotted or restored
+    # (0 keeps them forever)
+    session_idle_ttl_hours: float = 24
+
+    # Admission control for LLM-backed endpoints
+    admission_max_in_flight: int = 32
+    admission_max_queue: int = 64
+    admission_queue_timeout: float = 10.0
+    admission_trust_forwarded_for: bool = False
+    # Share of in-flight slots and wait queue that evaluations may hold
+    admission_evaluation_max_share: float = 0.5
+    rate_limit_client_per_minute: float = 60
+    rate_limit_client_burst: float = 20
+    rate_limit_session_per_minute: float = 20
+    rate_limit_session_burst: float = 5
+
+    # LLM call scheduling: concurrent calls per model, and the share of a
+    # model's slots that evaluations may hold
+    llm_concurrency: int = 8
+    llm_concurrency_per_model: dict = {}
+    llm_evaluation_max_share: float = 0.5
+    # Seconds an evaluation may wait for an LLM slot before a 503
+    llm_evaluation_queue_timeout: float = 30.0
+
+    # How long replies to keyed chat turns are kept for retries
+    idempotency_ttl_seconds: float = 300
+    idempotency_max_entries: int = 10000
+    # Chat turns that may wait behind a session's running turn
+    session_max_queued_turns: int = 2
+
+    # Request profiling: fraction of requests sampled, stack sampling
+    # interval, where collapsed-stack files go (empty means
+    # backend/data/profiles) and how many are kept, plus how many of the
+    # slowest recent requests to remember and for how long
+    profiling_sample_rate: float = 0.0
+    profiling_interval_ms: float = 5
+    profiling_output_dir: str = ""
+    profiling_max_files: int = 100
+    profiling_slow_traces: int = 20
+    profiling_trace_window_seconds: float = 900
+
+    # Required in X-Admin-Token for admin endpoints and on-demand profiling;
+    # both are disabled while it is empty
+    admin_token: str = ""
+
     class Config:
         env_file = ".env"
         case_sensitive = False
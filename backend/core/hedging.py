@@ -0,0 +1,230 @@
+"""
+Hedged LLM requests for chat turns.
+
+The primary model is streamed. If it has not produced a first token by a
+deadline derived from its recent first-token latency (p95 by default), the
+same prompt is sent to a faster backup model and whichever call produces
+a token first wins. The losing call is cancelled the moment the race is
+decided, which closes its HTTP stream, so no call outlives its turn.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncContextManager, Callable, Deque, Dict, Optional, Tuple
+
+PRIMARY = "primary"
+BACKUP = "backup"
+
+
+class LatencyWindow:
+    """Rolling window of recent latencies with quantile lookups."""
+
+    def __init__(self, size: int = 1000):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def observe(self, seconds: float) -> None:
+        """Record one latency."""
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Latency at quantile q, or None without samples."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _Race:
+    """Shared state of one hedged call."""
+
+    def __init__(self):
+        self.decided = asyncio.Event()
+        self.winner: Optional[str] = None
+
+    def claim(self, tier: str) -> bool:
+        """Claim the win for a tier; True if it is (or already was) the winner."""
+        if self.winner is None:
+            self.winner = tier
+            self.decided.set()
+        return self.winner == tier
+
+
+class HedgedInvoker:
+    """Runs chat prompts with an optional hedge to a faster model tier."""
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        initial_delay: float = 2.0,
+        min_delay: float = 0.2,
+        min_samples: int = 20,
+    ):
+        self.quantile = quantile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self.first_token = LatencyWindow()
+        self.turn_latency = LatencyWindow()
+        self.wins = {PRIMARY: 0, BACKUP: 0}
+        self.hedges_fired = 0
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the primary's first token before hedging."""
+        if len(self.first_token) < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, self.first_token.quantile(self.quantile))
+
+    async def _stream(
+        self,
+        llm,
+        prompt,
+        tier: str,
+        race: _Race,
+        started: float,
+        slot: Optional[Callable[[], AsyncContextManager]] = None,
+    ) -> str:
+        """Stream one tier's reply, inside a scheduler slot if one is given."""
+        if slot is not None:
+            async with slot():
+                return await self._stream(llm, prompt, tier, race, started)
+
+        chunks = []
+        try:
+            async for chunk in llm.astream(prompt):
+                if not chunks:
+                    if tier == PRIMARY:
+                        self.first_token.observe(time.monotonic() - started)
+                    if not race.claim(tier):
+                        return ""
+                chunks.append(chunk.content)
+        except asyncio.CancelledError:
+            if tier == PRIMARY and not chunks:
+                # Lost the race before its first token; the time it had
+                # waited is a lower bound, but dropping it would leave only
+                # the fast calls and drag the hedge deadline down
+                self.first_token.observe(time.monotonic() - started)
+            raise
+        # An empty reply still counts as an answer
+        race.claim(tier)
+        return "".join(chunks)
+
+    @staticmethod
+    async def _wait(
+        race: _Race, calls: Dict[str, asyncio.Task], timeout: Optional[float] = None
+    ) -> None:
+        """Wait until a tier wins, every call has finished, or the timeout passes."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        decided = asyncio.ensure_future(race.decided.wait())
+        try:
+            while not race.decided.is_set():
+                pending = [call for call in calls.values() if not call.done()]
+                if not pending:
+                    return
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return
+                await asyncio.wait(
+                    [decided, *pending],
+                    timeout=remaining,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+        finally:
+            decided.cancel()
+
+    async def invoke(
+        self,
+        prompt,
+        primary,
+        backup=None,
+        backup_slot: Optional[Callable[[], AsyncContextManager]] = None,
+    ) -> Tuple[str, str]:
+        """
+        Get a reply for a prompt, hedging to the backup model if the primary is slow.
+
+        Args:
+            prompt: Prompt value or string accepted by the chat models
+            primary: Chat model to try first
+            backup: Faster chat model to hedge to, or None to disable hedging
+            backup_slot: Factory for the scheduler slot a hedge call must hold
+
+        Returns:
+            Tuple of (reply text, winning tier)
+        """
+        started = time.monotonic()
+        race = _Race()
+
+        if backup is None:
+            text = await self._stream(primary, prompt, PRIMARY, race, started)
+            self._record(PRIMARY, started)
+            return text, PRIMARY
+
+        calls: Dict[str, asyncio.Task] = {
+            PRIMARY: asyncio.create_task(
+                self._stream(primary, prompt, PRIMARY, race, started)
+            )
+        }
+        try:
+            await self._wait(race, calls, timeout=self.hedge_delay())
+            if not race.decided.is_set() and not calls[PRIMARY].done():
+                with self._lock:
+                    self.hedges_fired += 1
+                calls[BACKUP] = asyncio.create_task(
+                    self._stream(backup, prompt, BACKUP, race, started, backup_slot)
+                )
+                await self._wait(race, calls)
+
+            winner = race.winner
+            # Cancel the loser now rather than letting it stream to the end
+            await self._cancel([call for tier, call in calls.items() if tier != winner])
+            if winner is None:
+                # Every tier failed before answering; surface the primary's error
+                calls[PRIMARY].result()
+
+            text = await calls[winner]
+        finally:
+            # Also reached when the turn itself is cancelled
+            await self._cancel(list(calls.values()))
+
+        self._record(winner, started)
+        return text, winner
+
+    @staticmethod
+    async def _cancel(calls) -> None:
+        """Cancel calls and wait until they have stopped."""
+        for call in calls:
+            call.cancel()
+        await asyncio.gather(*calls, return_exceptions=True)
+
+    def _record(self, tier: str, started: float) -> None:
+        """Count a win and the turn's end-to-end latency."""
+        with self._lock:
+            self.wins[tier] += 1
+            self.turn_latency.observe(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        """Win counts per tier, hedge rate and latency quantiles in ms."""
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * 1000, 1)
+
+        return {
+            "wins": dict(self.wins),
+            "hedges_fired": self.hedges_fired,
+            "hedge_delay_ms": ms(self.hedge_delay()),
+            "turn_latency_ms": {
+                "p50": ms(self.turn_latency.quantile(0.5)),
+                "p95": ms(self.turn_latency.quantile(0.95)),
+                "p99": ms(self.turn_latency.quantile(0.99)),
+            },
+            "primary_first_token_ms": {
+                "p50": ms(self.first_token.quantile(0.5)),
+                "p95": ms(self.first_token.quantile(0.95)),
+                "p99": ms(self.first_token.quantile(0.99)),
+            },
+        }
@@ -0,0 +1,190 @@
+"""
+Idempotent, per-session serialized chat turns.
+
+A turn sent with an idempotency key runs at most once: a duplicate that
+arrives while the original is running joins it (single-flight), and one
+that arrives afterwards gets the cached result for a short while. All
+turns of a session, keyed or not, run one at a time so concurrent
+requests cannot interleave writes to the session's memory. Only a few
+turns may wait on a session at once, and new turns are checked (e.g.
+rate limited) before they wait, so a rejected turn fails fast.
+
+A key is bound to a fingerprint of the request it was first sent with;
+reusing it for a different request is rejected with 422 instead of
+silently returning the other request's reply.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from backend.core.admission import too_many_requests
+from backend.core.config import get_settings
+
+
+def request_fingerprint(*parts: str) -> bytes:
+    """Digest identifying a request's content, for idempotency key checks."""
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = part.encode("utf-8")
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.digest()
+
+
+def _key_reused() -> HTTPException:
+    """Error for an idempotency key sent again with a different request."""
+    return HTTPException(
+        status_code=422,
+        detail="Idempotency key was already used for a different request",
+    )
+
+
+class _SessionLock:
+    """Lock for one session plus the number of turns holding or awaiting it."""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class TurnCoordinator:
+    """Deduplicates keyed turns and serializes turns within a session."""
+
+    def __init__(
+        self, ttl: float = 300.0, max_entries: int = 10000, max_queued: int = 2
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Turns that may wait behind a session's running turn
+        self.max_queued = max_queued
+        # Finished turns as (expiry, request fingerprint, result)
+        self._results: "OrderedDict[Tuple[str, str], Tuple[float, bytes, Any]]" = (
+            OrderedDict()
+        )
+        # Running turns as (request fingerprint, future)
+        self._in_flight: Dict[Tuple[str, str], Tuple[bytes, asyncio.Future]] = {}
+        self._session_locks: Dict[str, _SessionLock] = {}
+
+    def _cached(self, key: Tuple[str, str], fingerprint: bytes) -> Tuple[bool, Any]:
+        """Look up a finished turn, dropping it if it has expired."""
+        entry = self._results.get(key)
+        if entry is None:
+            return False, None
+        expires_at, stored_fingerprint, result = entry
+        if expires_at < time.monotonic():
+            del self._results[key]
+            return False, None
+        if stored_fingerprint != fingerprint:
+            raise _key_reused()
+        return True, result
+
+    def _store(self, key: Tuple[str, str], fingerprint: bytes, result: Any) -> None:
+        """Cache a finished turn, evicting the oldest entries past the limit."""
+        self._results[key] = (time.monotonic() + self.ttl, fingerprint, result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    async def _serialized(
+        self,
+        session_id: str,
+        func: Callable[[], Awaitable[Any]],
+        check: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        """Run a turn while holding its session's lock."""
+        entry = self._session_locks.get(session_id)
+        if entry is not None and entry.users > self.max_queued:
+            raise too_many_requests("Too many turns queued for this session", 1)
+        if check is not None:
+            check()
+        if entry is None:
+            entry = self._session_locks[session_id] = _SessionLock()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                return await func()
+        finally:
+            entry.users -= 1
+            if entry.users == 0:
+                del self._session_locks[session_id]
+
+    async def run(
+        self,
+        session_id: str,
+        idempotency_key: Optional[str],
+        func: Callable[[], Awaitable[Any]],
+        fingerprint: bytes = b"",
+        check: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        """
+        Run a chat turn at most once per idempotency key.
+
+        Args:
+            session_id: Session the turn belongs to
+            idempotency_key: Client-chosen key identifying the turn, if any
+            func: Coroutine function performing the turn
+            fingerprint: Digest of the request's content, see request_fingerprint
+            check: Called before a new turn waits for its session, e.g. to
+                rate limit it; not called for cached or joined duplicates
+
+        Returns:
+            The turn's result, shared with any duplicates
+
+        Raises:
+            HTTPException: 422 when the key was used for a different request,
+                429 when too many turns are queued for the session
+        """
+        if idempotency_key is None:
+            return await self._serialized(session_id, func, check)
+
+        key = (session_id, idempotency_key)
+        found, result = self._cached(key, fingerprint)
+        if found:
+            return result
+
+        running = self._in_flight.get(key)
+        if running is not None:
+            running_fingerprint, future = running
+            if running_fingerprint != fingerprint:
+                raise _key_reused()
+            # Shield so a disconnecting duplicate does not cancel the original
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        # Errors are re-raised to the original caller; duplicates are optional
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._in_flight[key] = (fingerprint, future)
+        try:
+            result = await self._serialized(session_id, func, check)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+            raise
+        finally:
+            del self._in_flight[key]
+
+        # Failed turns are not cached, so a retry runs them again
+        self._store(key, fingerprint, result)
+        future.set_result(result)
+        return result
+
+
+@lru_cache()
+def get_turn_coordinator() -> TurnCoordinator:
+    """Get the shared turn coordinator, configured from settings."""
+    settings = get_settings()
+    return TurnCoordinator(
+        ttl=settings.idempotency_ttl_seconds,
+        max_entries=settings.idempotency_max_entries,
+        max_queued=settings.session_max_queued_turns,
+    )
@@ -1,13 +1,18 @@
-from langchain_openai import ChatOpenAI
+from typing import Optional
 from backend.core.config import get_settings
 
 
-def get_llm_client():
-    """Initialize and return OpenAI LLM client."""
+def get_llm_client(model: Optional[str] = None):
+    """Initialize and return OpenAI LLM client, for openai_model by default."""
+    # Imported here so that starting the app does not pay for LangChain/OpenAI
+    from langchain_openai import ChatOpenAI
+
     settings = get_settings()
+    if not settings.openai_api_key:
+        raise ValueError("OPENAI_API_KEY is not set")
 
     return ChatOpenAI(
-        model=settings.openai_model,
+        model=model or settings.openai_model,
         temperature=settings.openai_temperature,
         api_key=settings.openai_api_key,
     )
@@ -0,0 +1,235 @@
+"""
+Priority-aware scheduler for LLM calls.
+
+Every LLM call waits for a slot on its model. Slots go to waiting chat
+turns before evaluations, and evaluations may only ever hold part of a
+model's slots, so an evaluation burst cannot delay a chat turn by more
+than one call. Within a priority class, slots are shared between
+sessions by weighted fair queuing, so one busy session cannot starve the
+others. Priority classes may have a queue timeout, so evaluations give up
+with a 503 instead of holding their admission slot indefinitely.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from bisect import bisect_left
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from backend.core.config import get_settings
+
+CHAT = "chat"
+EVALUATION = "evaluation"
+
+# Highest priority first
+PRIORITY_CLASSES = (CHAT, EVALUATION)
+
+# Upper bounds of the wait-time histogram buckets, in milliseconds
+WAIT_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class WaitHistogram:
+    """Fixed-bucket histogram of queue wait times."""
+
+    def __init__(self):
+        self.counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.count = 0
+
+    def observe(self, wait_ms: float) -> None:
+        """Record one wait."""
+        self.counts[bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+        self.total_ms += wait_ms
+        self.count += 1
+
+    def to_dict(self) -> Dict:
+        """Cumulative bucket counts keyed by upper bound."""
+        buckets = {}
+        running = 0
+        for bound, count in zip(WAIT_BUCKETS_MS + ("+Inf",), self.counts):
+            running += count
+            buckets[str(bound)] = running
+        return {
+            "buckets_ms": buckets,
+            "count": self.count,
+            "sum_ms": round(self.total_ms, 3),
+        }
+
+
+class _ModelQueue:
+    """Waiting calls and running slots for one model."""
+
+    def __init__(self, limit: int, class_limits: Dict[str, int]):
+        self.limit = limit
+        self.class_limits = class_limits
+        self.running = 0
+        self.running_by_class = {cls: 0 for cls in PRIORITY_CLASSES}
+        self.waiting_by_class = {cls: 0 for cls in PRIORITY_CLASSES}
+        # Per class: heap of (finish tag, sequence, future)
+        self.heaps: Dict[str, List] = {cls: [] for cls in PRIORITY_CLASSES}
+        self.virtual_time = {cls: 0.0 for cls in PRIORITY_CLASSES}
+        self.last_finish: Dict[str, Dict[str, float]] = {
+            cls: {} for cls in PRIORITY_CLASSES
+        }
+
+
+class LLMScheduler:
+    """Schedules LLM calls by priority class, fairly across sessions."""
+
+    def __init__(
+        self,
+        default_concurrency: int = 8,
+        model_concurrency: Optional[Dict[str, int]] = None,
+        evaluation_max_share: float = 0.5,
+        queue_timeouts: Optional[Dict[str, float]] = None,
+    ):
+        self.default_concurrency = default_concurrency
+        self.model_concurrency = model_concurrency or {}
+        self.evaluation_max_share = evaluation_max_share
+        # Longest a call of a class may wait for a slot; absent means forever
+        self.queue_timeouts = queue_timeouts or {}
+        self._queues: Dict[str, _ModelQueue] = {}
+        self._sequence = itertools.count()
+        self._waits = {cls: WaitHistogram() for cls in PRIORITY_CLASSES}
+
+    def _queue(self, model: str) -> _ModelQueue:
+        """Get or create the queue for a model."""
+        queue = self._queues.get(model)
+        if queue is None:
+            limit = self.model_concurrency.get(model, self.default_concurrency)
+            evaluation_limit = max(1, int(limit * self.evaluation_max_share))
+            queue = self._queues[model] = _ModelQueue(
+                limit, {CHAT: limit, EVALUATION: evaluation_limit}
+            )
+        return queue
+
+    def _enqueue(
+        self,
+        queue: _ModelQueue,
+        priority: str,
+        session_id: str,
+        weight: float,
+        future: asyncio.Future,
+    ) -> None:
+        """Queue a call with its weighted fair queuing finish tag."""
+        last_finish = queue.last_finish[priority]
+        start = max(queue.virtual_time[priority], last_finish.get(session_id, 0.0))
+        finish = start + 1 / weight
+        last_finish[session_id] = finish
+        heapq.heappush(queue.heaps[priority], (finish, next(self._sequence), future))
+        queue.waiting_by_class[priority] += 1
+
+    def _dispatch(self, queue: _ModelQueue) -> None:
+        """Hand free slots to the highest-priority, fairest waiting calls."""
+        while queue.running < queue.limit:
+            for priority in PRIORITY_CLASSES:
+                heap = queue.heaps[priority]
+                if queue.running_by_class[priority] >= queue.class_limits[priority]:
+                    continue
+                # Drop calls whose clients went away while waiting
+                while heap and heap[0][2].done():
+                    heapq.heappop(heap)
+                if not heap:
+                    # Every session is idle, so fairness history can be reset
+                    queue.virtual_time[priority] = 0.0
+                    queue.last_finish[priority].clear()
+                    continue
+
+                finish, _, future = heapq.heappop(heap)
+                queue.virtual_time[priority] = finish
+                queue.waiting_by_class[priority] -= 1
+                queue.running_by_class[priority] += 1
+                queue.running += 1
+                future.set_result(None)
+                break
+            else:
+                return
+
+    def _release(self, queue: _ModelQueue, priority: str) -> None:
+        """Free a slot and pass it on."""
+        queue.running -= 1
+        queue.running_by_class[priority] -= 1
+        self._dispatch(queue)
+
+    @asynccontextmanager
+    async def slot(
+        self, model: str, priority: str, session_id: str, weight: float = 1.0
+    ) -> AsyncIterator[None]:
+        """
+        Hold one of the model's concurrency slots for the duration of the block.
+
+        Raises:
+            HTTPException: 503 when the class's queue timeout passes first
+        """
+        queue = self._queue(model)
+        future = asyncio.get_running_loop().create_future()
+        enqueued = time.monotonic()
+        self._enqueue(queue, priority, session_id, weight, future)
+        self._dispatch(queue)
+
+        timeout = self.queue_timeouts.get(priority)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            if future.done() and not future.cancelled():
+                # Granted a slot just as the caller went away
+                self._release(queue, priority)
+            else:
+                future.cancel()
+                queue.waiting_by_class[priority] -= 1
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise HTTPException(
+                status_code=503,
+                detail="LLM capacity is busy, please retry",
+                headers={"Retry-After": str(max(1, math.ceil(timeout)))},
+            )
+
+        self._waits[priority].observe((time.monotonic() - enqueued) * 1000)
+        try:
+            yield
+        finally:
+            self._release(queue, priority)
+
+    def stats(self) -> Dict:
+        """Queue depth, running calls and wait-time histograms per class."""
+        return {
+            "classes": {
+                priority: {
+                    "queue_depth": sum(
+                        q.waiting_by_class[priority] for q in self._queues.values()
+                    ),
+                    "running": sum(
+                        q.running_by_class[priority] for q in self._queues.values()
+                    ),
+                    "wait_ms": self._waits[priority].to_dict(),
+                }
+                for priority in PRIORITY_CLASSES
+            },
+            "models": {
+                model: {
+                    "limit": q.limit,
+                    "running": q.running,
+                    "queue_depth": sum(q.waiting_by_class.values()),
+                }
+                for model, q in self._queues.items()
+            },
+        }
+
+
+@lru_cache()
+def get_llm_scheduler() -> LLMScheduler:
+    """Get the shared LLM scheduler, configured from settings."""
+    settings = get_settings()
+    return LLMScheduler(
+        default_concurrency=settings.llm_concurrency,
+        model_concurrency=settings.llm_concurrency_per_model,
+        evaluation_max_share=settings.llm_evaluation_max_share,
+        queue_timeouts={EVALUATION: settings.llm_evaluation_queue_timeout},
+    )
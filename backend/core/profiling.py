@@ -0,0 +1,294 @@
+"""
+On-demand sampling profiler for API requests.
+
+Routes built with ProfiledRoute time every request and keep the slowest
+recent ones in a small in-memory buffer. A request is also profiled when
+it is picked by PROFILING_SAMPLE_RATE or carries an ``X-Profile`` header
+together with the admin token. For a profiled request, a sampler thread
+records the stacks of the event loop thread and of any worker thread
+running the request's blocking work, and writes them as collapsed stacks
+(the input format of flamegraph.pl and speedscope) to a bounded
+directory.
+"""
+
+import contextvars
+import heapq
+import itertools
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from starlette.exceptions import HTTPException
+from starlette.concurrency import run_in_threadpool as _run_in_threadpool
+
+from backend.core.config import get_settings
+
+IDLE_FRAME = "select (selectors.py)"
+
+_active_sampler: contextvars.ContextVar[Optional["StackSampler"]] = (
+    contextvars.ContextVar("active_sampler", default=None)
+)
+
+
+class StackSampler:
+    """Samples the stacks of a set of threads at a fixed interval."""
+
+    def __init__(self, interval: float, thread_ids: Set[int]):
+        self.interval = interval
+        self._thread_ids = set(thread_ids)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def add_thread(self, thread_id: int) -> None:
+        """Start sampling a thread."""
+        with self._lock:
+            self._thread_ids.add(thread_id)
+
+    def remove_thread(self, thread_id: int) -> None:
+        """Stop sampling a thread."""
+        with self._lock:
+            self._thread_ids.discard(thread_id)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                thread_ids = list(self._thread_ids)
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[self._stack(frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _stack(frame) -> Tuple[str, ...]:
+        """Frame names from the outermost call to the innermost."""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({Path(code.co_filename).name})")
+            frame = frame.f_back
+        return tuple(reversed(names))
+
+    def collapsed(self) -> str:
+        """Stacks in collapsed format, one "a;b;c count" line per stack."""
+        return "".join(
+            f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.items()
+        )
+
+
+async def run_in_threadpool(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Run blocking work in the threadpool, sampled if the request is profiled."""
+    sampler = _active_sampler.get()
+    if sampler is None:
+        return await _run_in_threadpool(func, *args, **kwargs)
+
+    def sampled() -> Any:
+        thread_id = threading.get_ident()
+        sampler.add_thread(thread_id)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sampler.remove_thread(thread_id)
+
+    return await _run_in_threadpool(sampled)
+
+
+class RequestProfiler:
+    """Times requests, profiles sampled ones and keeps the slowest traces."""
+
+    def __init__(
+        self,
+        output_dir: Optional[Path] = None,
+        sample_rate: float = 0.0,
+        interval: float = 0.005,
+        max_files: int = 100,
+        max_traces: int = 20,
+        trace_window: float = 900.0,
+        admin_token: str = "",
+    ):
+        self.output_dir = (
+            Path(output_dir)
+            if output_dir
+            else Path(__file__).parent.parent / "data" / "profiles"
+        )
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_files = max_files
+        self.max_traces = max_traces
+        self.trace_window = trace_window
+        self.admin_token = admin_token
+        # Min-heap of (duration, sequence, trace): the root is the fastest kept
+        self._slowest: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def should_profile(self, request: Request) -> bool:
+        """Whether a request asked for, or was sampled for, profiling."""
+        if self.admin_token and request.headers.get("X-Profile"):
+            token = request.headers.get("X-Admin-Token", "")
+            if secrets.compare_digest(token.encode(), self.admin_token.encode()):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def run(
+        self, request: Request, handler: Callable[[Request], Any]
+    ) -> Response:
+        """Run a route handler, profiling it if requested."""
+        sampler = None
+        token = None
+        if self.should_profile(request):
+            sampler = StackSampler(self.interval, {threading.get_ident()})
+            token = _active_sampler.set(sampler)
+            sampler.start()
+
+        started_at = time.time()
+        start = time.perf_counter()
+        status_code = 500
+        try:
+            response = await handler(request)
+            status_code = response.status_code
+        except HTTPException as e:
+            # Turned into a response further out, e.g. a 404 or 429
+            status_code = e.status_code
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            profile_file = None
+            top_stacks = None
+            if sampler is not None:
+                _active_sampler.reset(token)
+                # Joining the sampler and writing the file both block
+                profile_file = await _run_in_threadpool(
+                    self._finish_profile, request, duration_ms, sampler
+                )
+                # An event loop parked in select() is just waiting on others
+                busy = [
+                    (stack, count)
+                    for stack, count in sampler.stacks.most_common()
+                    if stack[-1] != IDLE_FRAME
+                ]
+                top_stacks = [
+                    {"stack": ";".join(stack[-8:]), "samples": count}
+                    for stack, count in busy[:5]
+                ]
+            self._record(
+                {
+                    "method": request.method,
+                    "path": request.url.path,
+                    "status_code": status_code,
+                    "duration_ms": round(duration_ms, 2),
+                    "started_at": started_at,
+                    "profile_file": profile_file,
+                    "top_stacks": top_stacks,
+                }
+            )
+
+        if profile_file:
+            response.headers["X-Profile-File"] = profile_file
+        return response
+
+    def _finish_profile(
+        self, request: Request, duration_ms: float, sampler: StackSampler
+    ) -> Optional[str]:
+        """Stop the sampler and write its profile."""
+        sampler.stop()
+        return self._write_profile(request, duration_ms, sampler)
+
+    def _write_profile(
+        self, request: Request, duration_ms: float, sampler: StackSampler
+    ) -> Optional[str]:
+        """Write collapsed stacks and prune the oldest files over the limit."""
+        route = re.sub(r"[^A-Za-z0-9_-]", "_", request.url.path.strip("/")) or "root"
+        name = (
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{next(self._sequence)}"
+            f"-{request.method.lower()}-{route[:60]}-{duration_ms:.0f}ms.folded"
+        )
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            (self.output_dir / name).write_text(sampler.collapsed(), encoding="utf-8")
+            profiles = sorted(
+                self.output_dir.glob("*.folded"), key=lambda p: p.stat().st_mtime
+            )
+            for old in profiles[: max(0, len(profiles) - self.max_files)]:
+                old.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"Error writing profile {name}: {e}")
+            return None
+        return name
+
+    def _expire(self) -> None:
+        """Drop kept traces older than the trace window."""
+        cutoff = time.time() - self.trace_window
+        if any(trace["started_at"] < cutoff for _, _, trace in self._slowest):
+            self._slowest = [e for e in self._slowest if e[2]["started_at"] >= cutoff]
+            heapq.heapify(self._slowest)
+
+    def _record(self, trace: Dict[str, Any]) -> None:
+        """Keep the trace if it is among the slowest recent ones."""
+        entry = (trace["duration_ms"], next(self._sequence), trace)
+        with self._lock:
+            self._expire()
+            if len(self._slowest) < self.max_traces:
+                heapq.heappush(self._slowest, entry)
+            elif entry[0] > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self) -> List[Dict[str, Any]]:
+        """Slowest traces within the trace window, slowest first."""
+        with self._lock:
+            self._expire()
+            return [trace for _, _, trace in sorted(self._slowest, reverse=True)]
+
+    def clear(self) -> None:
+        """Forget kept traces, e.g. to start a fresh measurement window."""
+        with self._lock:
+            self._slowest.clear()
+
+
+@lru_cache()
+def get_request_profiler() -> RequestProfiler:
+    """Get the shared request profiler, configured from settings."""
+    settings = get_settings()
+    return RequestProfiler(
+        output_dir=settings.profiling_output_dir or None,
+        sample_rate=settings.profiling_sample_rate,
+        interval=settings.profiling_interval_ms / 1000,
+        max_files=settings.profiling_max_files,
+        max_traces=settings.profiling_slow_traces,
+        trace_window=settings.profiling_trace_window_seconds,
+        admin_token=settings.admin_token,
+    )
+
+
+class ProfiledRoute(APIRoute):
+    """Route class that passes every request through the request profiler."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request: Request) -> Response:
+            return await get_request_profiler().run(request, handler)
+
+        return profiled_handler
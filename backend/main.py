@@ -1,16 +1,49 @@
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from backend.core.config import get_settings
-from backend.routers import chat, evaluate, cases
+from backend.core.compression import CompressionMiddleware
+from backend.routers import admin, chat, evaluate, cases
+from backend.services.case_loader import case_loader
+from backend.services.chat_service import get_chat_service
+from backend.services.session_log import session_log
 
 # Get settings
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load cases and restore live sessions on startup, snapshot them on shutdown."""
+    # Warm the case library off the event loop; the first load may have to
+    # re-read changed case files
+    threading.Thread(
+        target=case_loader.load_all_cases, name="case-load", daemon=True
+    ).start()
+    chat_service = get_chat_service()
+    # Sessions stream in on a background thread so the app serves immediately
+    chat_service.start_restore()
+    yield
+    count = chat_service.snapshot_sessions()
+    print(f"Saved {count} chat sessions")
+    session_log.close()
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     description="Virtual Simulated Patient API for medical training",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+
+# Compress large payloads (case lists, long histories, evaluations)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
 )
 
 # Configure CORS
@@ -26,6 +59,7 @@ app.add_middleware(
 app.include_router(chat.router)
 app.include_router(evaluate.router)
 app.include_router(cases.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -16,6 +16,8 @@ class ChatRequest(BaseModel):
     case_id: str
     message: str
     messages: Optional[List[ChatMessage]] = None
+    # Client-chosen key; retries with the same key reuse the first reply
+    idempotency_key: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
@@ -0,0 +1,66 @@
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException
+from typing import Optional
+from backend.core.config import get_settings
+from backend.core.llm_scheduler import LLMScheduler, get_llm_scheduler
+from backend.core.profiling import RequestProfiler, get_request_profiler
+from backend.services.chat_service import ChatService, get_chat_service
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Reject requests without the admin token.
+
+    Admin endpoints expose request paths, which carry session IDs, so
+    they stay disabled until an admin token is configured.
+    """
+    admin_token = get_settings().admin_token
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+router = APIRouter(
+    prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)]
+)
+
+
+@router.get("/llm-scheduler")
+async def get_scheduler_stats(
+    scheduler: LLMScheduler = Depends(get_llm_scheduler),
+):
+    """
+    Get LLM scheduler queue depths and wait-time histograms.
+
+    Returns:
+        Per-class queue depth, running calls and wait histograms, and
+        per-model slot usage
+    """
+    return scheduler.stats()
+
+
+@router.get("/hedging")
+async def get_hedging_stats(chat_service: ChatService = Depends(get_chat_service)):
+    """
+    Get hedged chat request statistics.
+
+    Returns:
+        Wins per model tier, hedges fired, the current hedge delay, and
+        chat-turn and primary first-token latency quantiles
+    """
+    return chat_service.hedger.stats()
+
+
+@router.get("/slow-requests")
+async def get_slow_requests(
+    profiler: RequestProfiler = Depends(get_request_profiler),
+):
+    """
+    Get the slowest recent requests.
+
+    Returns:
+        Traces, slowest first, with the profile file and hottest stacks
+        for requests that were profiled
+    """
+    return {"requests": profiler.slowest()}
@@ -1,37 +1,104 @@
-from fastapi import APIRouter, HTTPException
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from typing import Optional
+from backend.core.admission import (
+    AdmissionController,
+    get_admission_controller,
+    get_client_id,
+)
+from backend.core.idempotency import (
+    TurnCoordinator,
+    get_turn_coordinator,
+    request_fingerprint,
+)
+from backend.core.profiling import ProfiledRoute
+from backend.core.llm_scheduler import CHAT, LLMScheduler, get_llm_scheduler
 from backend.models.chat_history import ChatRequest, ChatResponse
-from backend.services.chat_service import chat_service
+from backend.services.chat_service import ChatService, get_chat_service
 
-router = APIRouter(prefix="/api/chat", tags=["chat"])
+# Largest history page a client may ask for, in turns
+MAX_HISTORY_PAGE = 500
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag, by weak comparison."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+router = APIRouter(prefix="/api/chat", tags=["chat"], route_class=ProfiledRoute)
 
 
 @router.post("/", response_model=ChatResponse)
-async def send_message(request: ChatRequest):
+async def send_message(
+    request: ChatRequest,
+    http_request: Request,
+    chat_service: ChatService = Depends(get_chat_service),
+    admission: AdmissionController = Depends(get_admission_controller),
+    scheduler: LLMScheduler = Depends(get_llm_scheduler),
+    turns: TurnCoordinator = Depends(get_turn_coordinator),
+):
     """
     Send a message to the virtual patient and get a response.
 
+    Retries carrying the same idempotency_key share one LLM call and get
+    the same reply; reusing a key for a different message is a 422.
+    Turns within a session run one at a time.
+
     Args:
         request: ChatRequest containing session_id, case_id, and message
 
     Returns:
         ChatResponse with the patient's reply
     """
-    try:
-        response = chat_service.send_message(
-            session_id=request.session_id,
-            case_id=request.case_id,
-            message=request.message,
-        )
-
-        return ChatResponse(
-            session_id=request.session_id, response=response, case_id=request.case_id
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+    async def run_turn() -> ChatResponse:
+        # Rate limits were already checked by turns.run
+        async with admission.slot(CHAT):
+            try:
+                # Takes its LLM scheduler slots once it knows the model
+                response = await chat_service.send_message(
+                    session_id=request.session_id,
+                    case_id=request.case_id,
+                    message=request.message,
+                    scheduler=scheduler,
+                )
+
+                return ChatResponse(
+                    session_id=request.session_id,
+                    response=response,
+                    case_id=request.case_id,
+                )
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=str(e))
+
+    return await turns.run(
+        request.session_id,
+        request.idempotency_key,
+        run_turn,
+        request_fingerprint(request.case_id, request.message),
+        check=partial(
+            admission.check_rate, get_client_id(http_request), request.session_id
+        ),
+    )
 
 
 @router.post("/end-session")
-async def end_session(session_id: str, case_id: str):
+async def end_session(
+    session_id: str,
+    case_id: str,
+    chat_service: ChatService = Depends(get_chat_service),
+):
     """
     End a chat session and clean up resources.
 
@@ -50,18 +117,34 @@ async def end_session(session_id: str, case_id: str):
 
 
 @router.get("/history/{session_id}")
-async def get_chat_history(session_id: str):
+async def get_chat_history(
+    session_id: str,
+    http_request: Request,
+    since_turn: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_HISTORY_PAGE),
+    chat_service: ChatService = Depends(get_chat_service),
+):
     """
-    Get chat history for a session.
+    Get chat history for a session, one page at a time.
+
+    The ETag changes whenever the session gains a turn, so clients that
+    send it back in If-None-Match get a 304 until there is something new.
 
     Args:
         session_id: Session identifier
+        since_turn: Only return turns after this one
+        limit: Maximum number of turns to return
 
     Returns:
-        List of chat messages
+        Page of {role, content, turn} messages, the session's turn count
+        and whether more turns follow
     """
     try:
-        history = chat_service.get_chat_history(session_id)
-        return {"session_id": session_id, "messages": history}
+        etag = chat_service.get_history_etag(session_id)
+        if etag_matches(http_request.headers.get("If-None-Match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        page = chat_service.get_history_page(session_id, since_turn, limit)
+        return ORJSONResponse(page, headers={"ETag": etag})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,30 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from backend.core.admission import (
+    AdmissionController,
+    get_admission_controller,
+    get_client_id,
+)
+from backend.core.profiling import ProfiledRoute, run_in_threadpool
+from backend.core.llm_scheduler import EVALUATION, LLMScheduler, get_llm_scheduler
 from backend.models.evaluation_result import EvaluationRequest, EvaluationResult
-from backend.services.evaluation_service import evaluation_service
+from backend.services.evaluation_service import (
+    EvaluationService,
+    get_evaluation_service,
+)
 
-router = APIRouter(prefix="/api/evaluate", tags=["evaluation"])
+router = APIRouter(
+    prefix="/api/evaluate", tags=["evaluation"], route_class=ProfiledRoute
+)
 
 
 @router.post("/", response_model=EvaluationResult)
-async def evaluate_conversation(request: EvaluationRequest):
+async def evaluate_conversation(
+    request: EvaluationRequest,
+    http_request: Request,
+    evaluation_service: EvaluationService = Depends(get_evaluation_service),
+    admission: AdmissionController = Depends(get_admission_controller),
+    scheduler: LLMScheduler = Depends(get_llm_scheduler),
+):
     """
     Evaluate a student's conversation with the virtual patient.
 
@@ -16,13 +34,23 @@ async def evaluate_conversation(request: EvaluationRequest):
     Returns:
         EvaluationResult with scores and feedback
     """
-    try:
-        result = evaluation_service.evaluate_conversation(
-            session_id=request.session_id,
-            case_id=request.case_id,
-            messages=request.messages,
-        )
+    async with admission.admit(
+        get_client_id(http_request), request.session_id, EVALUATION
+    ):
+        try:
+            async with scheduler.slot(
+                evaluation_service.model_name, EVALUATION, request.session_id
+            ):
+                # The LLM call blocks, so keep it off the event loop
+                result = await run_in_threadpool(
+                    evaluation_service.evaluate_conversation,
+                    session_id=request.session_id,
+                    case_id=request.case_id,
+                    messages=request.messages,
+                )
 
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+            return result
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
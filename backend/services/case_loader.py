@@ -1,37 +1,238 @@
+import hashlib
 import json
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
 from backend.models.case import Case
 
+SNAPSHOT_MAGIC = b"VSPCASES"
+# Version 3 stores JSON; older pickled snapshots are ignored, never loaded
+SNAPSHOT_VERSION = 3
+
+# Below this many files a process pool costs more to start than it saves
+PARALLEL_THRESHOLD = 256
+
+
+@lru_cache()
+def _schema_fingerprint() -> str:
+    """Hash of the Case schema; snapshots built against another one are stale."""
+    schema = json.dumps(Case.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()
+
+
+def _parse_case_bytes(raw: bytes) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Validate the contents of one case file.
+
+    Returns:
+        Tuple of (validated case dict or None, error message)
+    """
+    try:
+        return Case(**json.loads(raw)).model_dump(), ""
+    except Exception as e:
+        return None, str(e)
+
+
+def _parse_case_file(case_file: str) -> Tuple[str, Optional[Dict[str, Any]], str]:
+    """
+    Parse and validate a single case file.
+
+    Runs inside worker processes, so it only takes and returns picklable
+    plain data.
+
+    Returns:
+        Tuple of (file path, validated case dict or None, content hash or error)
+    """
+    try:
+        with open(case_file, "rb") as f:
+            raw = f.read()
+    except OSError as e:
+        return case_file, None, str(e)
+    case_data, error = _parse_case_bytes(raw)
+    if case_data is None:
+        return case_file, None, error
+    return case_file, case_data, hashlib.sha256(raw).hexdigest()
+
 
 class CaseLoader:
     """Service for loading and managing medical cases."""
 
-    def __init__(self):
-        self.cases_dir = Path(__file__).parent.parent / "data" / "cases"
+    def __init__(
+        self,
+        cases_dir: Optional[Path] = None,
+        snapshot_path: Optional[Path] = None,
+        workers: int = 1,
+    ):
+        data_dir = Path(__file__).parent.parent / "data"
+        self.cases_dir = Path(cases_dir) if cases_dir else data_dir / "cases"
+        self.snapshot_path = (
+            Path(snapshot_path)
+            if snapshot_path
+            else self.cases_dir.parent / f"{self.cases_dir.name}.snapshot"
+        )
+        # Worker processes for build_snapshot; only the build step should use
+        # more than one, since forking a multi-threaded server is unsafe
+        self.workers = workers
         self._cases_cache: Optional[Dict[str, Case]] = None
+        self._lock = threading.Lock()
+
+    def _scan_manifest(self) -> Dict[str, List[int]]:
+        """Get the size and mtime of every case file, keyed by file name."""
+        manifest = {}
+        with os.scandir(self.cases_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    manifest[entry.name] = [stat.st_size, stat.st_mtime_ns]
+        return manifest
+
+    def _read_snapshot(self) -> Dict[str, List]:
+        """
+        Read the per-file entries of the compiled snapshot.
+
+        Returns:
+            {file name: [size, mtime, sha256, case dict or None]}, empty if
+            the snapshot is missing, unreadable or built for another schema
+        """
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                blob = f.read()
+        except OSError:
+            return {}
+
+        header_len = len(SNAPSHOT_MAGIC) + 1
+        if blob[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            return {}
+        if blob[len(SNAPSHOT_MAGIC)] != SNAPSHOT_VERSION:
+            return {}
+
+        try:
+            snapshot = orjson.loads(memoryview(blob)[header_len:])
+        except orjson.JSONDecodeError:
+            return {}
+
+        if (
+            not isinstance(snapshot, dict)
+            or snapshot.get("schema") != _schema_fingerprint()
+        ):
+            return {}
+        return snapshot.get("files", {})
+
+    def _write_snapshot(self, files: Dict[str, List]) -> None:
+        """Write validated cases with their size, mtime and content hash."""
+        snapshot = {"schema": _schema_fingerprint(), "files": files}
+        blob = SNAPSHOT_MAGIC + bytes([SNAPSHOT_VERSION]) + orjson.dumps(snapshot)
+        tmp_path = self.snapshot_path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"Error writing case snapshot {self.snapshot_path}: {e}")
+
+    @staticmethod
+    def _cases(files: Dict[str, List]) -> Dict[str, Case]:
+        """
+        Build cases from snapshot entries.
+
+        Entries were validated against the current schema, so they are
+        constructed without running pydantic validation again.
+        """
+        return {
+            entry[3]["id"]: Case.model_construct(**entry[3])
+            for _, entry in sorted(files.items())
+            if entry[3] is not None
+        }
+
+    def _refresh(
+        self, file_names: List[str], manifest: Dict[str, List[int]], stored: Dict
+    ) -> Dict[str, List]:
+        """
+        Re-read changed case files one by one.
+
+        A file whose content hash still matches its snapshot entry, e.g.
+        after a checkout only touched its mtime, keeps the validated case.
+        """
+        files = {}
+        for name in file_names:
+            try:
+                with open(self.cases_dir / name, "rb") as f:
+                    raw = f.read()
+            except OSError as e:
+                print(f"Error loading case {self.cases_dir / name}: {e}")
+                continue
+            digest = hashlib.sha256(raw).hexdigest()
+            entry = stored.get(name)
+            if entry is not None and entry[2] == digest:
+                case_data = entry[3]
+            else:
+                case_data, error = _parse_case_bytes(raw)
+                if case_data is None:
+                    print(f"Error loading case {self.cases_dir / name}: {error}")
+            # Files that failed validation stay in the snapshot so a broken
+            # file does not force a re-read on every boot
+            files[name] = manifest[name] + [digest, case_data]
+        return files
+
+    def build_snapshot(self) -> Dict[str, Case]:
+        """Parse all case files and write a fresh compiled snapshot."""
+        manifest = self._scan_manifest()
+        paths = [str(self.cases_dir / name) for name in sorted(manifest)]
+
+        if self.workers <= 1 or len(paths) < PARALLEL_THRESHOLD:
+            results = map(_parse_case_file, paths)
+        else:
+            chunksize = max(1, len(paths) // (self.workers * 4))
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(_parse_case_file, paths, chunksize=chunksize))
+
+        files = {}
+        for path, case_data, detail in results:
+            name = Path(path).name
+            if case_data is None:
+                print(f"Error loading case {path}: {detail}")
+                files[name] = manifest[name] + [None, None]
+            else:
+                files[name] = manifest[name] + [detail, case_data]
+        self._write_snapshot(files)
+        return self._cases(files)
 
     def load_all_cases(self) -> Dict[str, Case]:
-        """Load all cases from the data directory."""
+        """Load all cases from the snapshot, re-reading files that changed."""
         if self._cases_cache is not None:
             return self._cases_cache
 
-        cases = {}
+        with self._lock:
+            if self._cases_cache is not None:
+                return self._cases_cache
 
-        if not self.cases_dir.exists():
-            return cases
+            if not self.cases_dir.exists():
+                return {}
 
-        for case_file in self.cases_dir.glob("*.json"):
-            try:
-                with open(case_file, "r", encoding="utf-8") as f:
-                    case_data = json.load(f)
-                    case = Case(**case_data)
-                    cases[case.id] = case
-            except Exception as e:
-                print(f"Error loading case {case_file}: {e}")
+            manifest = self._scan_manifest()
+            stored = self._read_snapshot()
+            files = {}
+            changed = []
+            for name, stat in manifest.items():
+                entry = stored.get(name)
+                if entry is not None and entry[:2] == stat:
+                    files[name] = entry
+                else:
+                    changed.append(name)
 
-        self._cases_cache = cases
-        return cases
+            if changed or len(files) != len(stored):
+                files.update(self._refresh(changed, manifest, stored))
+                self._write_snapshot(files)
+
+            self._cases_cache = self._cases(files)
+            return self._cases_cache
 
     def get_case(self, case_id: str) -> Optional[Case]:
         """Get a specific case by ID."""
@@ -51,3 +252,12 @@ class CaseLoader:
 
 # Global case loader instance
 case_loader = CaseLoader()
+
+
+if __name__ == "__main__":
+    # Build step: python -m backend.services.case_loader [cases_dir]
+    loader = CaseLoader(
+        sys.argv[1] if len(sys.argv) > 1 else None, workers=os.cpu_count() or 1
+    )
+    built = loader.build_snapshot()
+    print(f"Wrote {len(built)} cases to {loader.snapshot_path}")
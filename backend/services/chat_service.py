@@ -1,40 +1,102 @@
+from backend.core.config import get_settings
+from backend.core.hedging import HedgedInvoker
 from backend.core.llm_client import get_llm_client
-from ai.chains.patient_chain import create_patient_chain
+from backend.core.llm_scheduler import CHAT, LLMScheduler
+from backend.core.profiling import run_in_threadpool
+from ai.chains.patient_chain import create_patient_prompt
 from ai.memory.conversation_memory import memory_manager
 from backend.services.case_loader import case_loader
-from typing import Optional
+from backend.services.session_log import session_log
+from pathlib import Path
+from functools import lru_cache, partial
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import os
+import secrets
+import threading
+import time
+import orjson
 
 
 class ChatService:
     """Service for handling chat interactions with virtual patient."""
 
     def __init__(self):
-        self.llm = get_llm_client()
-        self._active_chains = {}
+        settings = get_settings()
+        self._llms = {}
+        # case_id -> (case, prompt); one rendered persona shared by all sessions
+        self._case_prompts: Dict[str, Tuple[Any, Any]] = {}
+        self.hedge_model = settings.chat_hedge_model or None
+        self.hedger = HedgedInvoker(
+            quantile=settings.chat_hedge_quantile,
+            initial_delay=settings.chat_hedge_initial_delay_ms / 1000,
+            min_delay=settings.chat_hedge_min_delay_ms / 1000,
+        )
+        self._restore_thread: Optional[threading.Thread] = None
+        self.snapshot_path = (
+            Path(settings.session_snapshot_path)
+            if settings.session_snapshot_path
+            else session_log.log_dir / "live_sessions.snapshot"
+        )
+        self.session_idle_ttl = settings.session_idle_ttl_hours * 3600
+        # Epochs restart with every process, so ETags also carry a boot ID
+        self.boot_id = secrets.token_hex(4)
 
-    def get_or_create_chain(self, session_id: str, case_id: str):
-        """Get or create a conversation chain for a session."""
-        chain_key = f"{session_id}_{case_id}"
+    def get_llm(self, model: str):
+        """LLM client for a model, created on first use."""
+        if model not in self._llms:
+            self._llms[model] = get_llm_client(model)
+        return self._llms[model]
 
-        if chain_key not in self._active_chains:
-            # Get case data
-            case = case_loader.get_case(case_id)
-            if not case:
-                raise ValueError(f"Case {case_id} not found")
+    def model_for_case(self, case_id: str) -> str:
+        """Patient model for a case, chosen by its difficulty level."""
+        settings = get_settings()
+        case = case_loader.get_case(case_id)
+        if case and case.difficulty_level in settings.patient_model_by_difficulty:
+            return settings.patient_model_by_difficulty[case.difficulty_level]
+        return settings.patient_model or settings.openai_model
 
-            # Get or create memory
-            memory = memory_manager.get_memory(session_id)
+    def get_case_prompt(self, case_id: str):
+        """Get the patient prompt for a case, rebuilt if the case was reloaded."""
+        case = case_loader.get_case(case_id)
+        if not case:
+            raise ValueError(f"Case {case_id} not found")
 
-            # Create patient chain
-            chain = create_patient_chain(
-                llm=self.llm, memory=memory, case_data=case.model_dump()
-            )
+        cached = self._case_prompts.get(case_id)
+        if cached is None or cached[0] is not case:
+            cached = (case, create_patient_prompt(case.model_dump()))
+            self._case_prompts[case_id] = cached
+        return cached[1]
+
+    def _prepare_turn(self, session_id: str, case_id: str, message: str):
+        """
+        Render a turn's prompt and pick its models.
 
-            self._active_chains[chain_key] = chain
+        Blocks while the session is still being restored and on the first
+        use of a model, so it runs in the threadpool.
 
-        return self._active_chains[chain_key]
+        Returns:
+            Tuple of (prompt, patient model name, patient model, hedge
+            model or None)
+        """
+        prompt_template = self.get_case_prompt(case_id)
+        memory_manager.get_memory(session_id)
+        prompt = prompt_template.format_prompt(
+            chat_history=memory_manager.get_chat_history(session_id),
+            input=message,
+        )
+        # Looking up the case may wait on a case reload, so the model is
+        # picked here rather than on the event loop
+        model = self.model_for_case(case_id)
+        backup = self.get_llm(self.hedge_model) if self.hedge_model else None
+        return prompt, model, self.get_llm(model), backup
 
-    def send_message(self, session_id: str, case_id: str, message: str) -> str:
+    async def send_message(
+        self,
+        session_id: str,
+        case_id: str,
+        message: str,
+        scheduler: Optional[LLMScheduler] = None,
+    ) -> str:
         """
         Send a message to the virtual patient and get a response.
 
@@ -42,30 +104,184 @@ class ChatService:
             session_id: Unique session identifier
             case_id: Case identifier
             message: User's message
+            scheduler: Scheduler that the patient and hedge calls take
+                slots from
 
         Returns:
             Patient's response
         """
         try:
-            chain = self.get_or_create_chain(session_id, case_id)
-            response = chain.predict(input=message)
+            prompt, model, llm, backup = await run_in_threadpool(
+                self._prepare_turn, session_id, case_id, message
+            )
+            if scheduler is None:
+                response, _ = await self.hedger.invoke(prompt, llm, backup)
+            else:
+                backup_slot = partial(
+                    scheduler.slot, self.hedge_model, CHAT, session_id
+                )
+                async with scheduler.slot(model, CHAT, session_id):
+                    response, _ = await self.hedger.invoke(
+                        prompt, llm, backup, backup_slot
+                    )
+            # Saved only after the call so only the winning reply lands
+            memory_manager.add_turn(session_id, message, response)
+            session_log.log_turn(session_id, case_id, message, response)
             return response
         except Exception as e:
             raise Exception(f"Error in chat service: {str(e)}")
 
     def end_session(self, session_id: str, case_id: str) -> None:
         """End a chat session and clean up resources."""
-        chain_key = f"{session_id}_{case_id}"
+        memory_manager.delete_session(session_id)
+        session_log.end_session(session_id)
 
-        if chain_key in self._active_chains:
-            del self._active_chains[chain_key]
+    def get_history_etag(self, session_id: str) -> str:
+        """Entity tag that changes whenever a session's history changes."""
+        epoch, turns = memory_manager.get_history_version(session_id)
+        return f'"{self.boot_id}-{epoch}-{turns}"'
 
-        memory_manager.delete_session(session_id)
+    def get_history_page(
+        self, session_id: str, since_turn: int = 0, limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Get one page of chat history in compact {role, content, turn} form."""
+        _, turn_count = memory_manager.get_history_version(session_id)
+        messages, has_more = memory_manager.get_history_page(
+            session_id, since_turn, limit
+        )
+        return {
+            "session_id": session_id,
+            "turn_count": turn_count,
+            "messages": messages,
+            "has_more": has_more,
+        }
+
+    def _is_idle(self, last_active: float) -> bool:
+        """Whether a session has gone unused for longer than the idle TTL."""
+        return (
+            self.session_idle_ttl > 0
+            and time.time() - last_active > self.session_idle_ttl
+        )
+
+    def snapshot_sessions(self) -> int:
+        """
+        Write every live session's memory to the snapshot file.
+
+        Sessions idle for longer than the idle TTL are ended instead, since
+        students often leave without ending their session.
+
+        Only message records are saved; case prompts are shared per case and
+        rebuilt on first use after a restart.
+
+        Returns:
+            Number of sessions written
+        """
+        # Never snapshot a half-restored set of sessions
+        if self._restore_thread is not None:
+            self._restore_thread.join()
+
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        count = 0
+        with open(tmp_path, "wb") as f:
+            for session_id, messages, last_active in memory_manager.export_sessions():
+                if self._is_idle(last_active):
+                    session_log.end_session(session_id)
+                    continue
+                entry = {
+                    "session_id": session_id,
+                    "last_active": last_active,
+                    "messages": messages,
+                }
+                f.write(orjson.dumps(entry))
+                f.write(b"\n")
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        return count
+
+    def _iter_snapshot(self) -> Iterator[Tuple[str, List[Dict[str, str]], float]]:
+        """Stream sessions from the shutdown snapshot, one line at a time."""
+        for entry in session_log.read_records(self.snapshot_path):
+            yield (
+                entry["session_id"],
+                entry["messages"],
+                entry.get("last_active", time.time()),
+            )
+
+    def _iter_session_log(self) -> Iterator[Tuple[str, List[Dict[str, str]], float]]:
+        """Replay live sessions from the session log after a crash."""
+        for log_file in session_log.log_dir.glob("*.jsonl"):
+            session_id = None
+            ended = False
+            last_active = 0.0
+            messages = []
+            try:
+                for record in session_log.read_records(log_file):
+                    session_id = record["session_id"]
+                    last_active = record.get("ts", last_active)
+                    if record["type"] == "turn":
+                        messages.append({"role": "human", "content": record["user"]})
+                        messages.append({"role": "ai", "content": record["assistant"]})
+                    elif record["type"] == "end":
+                        ended = True
+            except Exception as e:
+                # One unreadable file must not cost every session after it
+                print(f"Error replaying session log {log_file.name}: {e}")
+                continue
+            if session_id is not None and not ended:
+                yield session_id, messages, last_active
+
+    def restore_sessions(self) -> int:
+        """
+        Restore session memories written before the last shutdown.
+
+        Uses the shutdown snapshot when present, otherwise replays the
+        session log. The snapshot is consumed so a later crash falls back to
+        the session log instead of reloading stale memories. Sessions idle
+        for longer than the idle TTL are ended rather than restored.
+
+        Returns:
+            Number of sessions restored
+        """
+        if self.snapshot_path.exists():
+            source = self._iter_snapshot()
+        else:
+            source = self._iter_session_log()
+
+        count = 0
+        for session_id, messages, last_active in source:
+            if self._is_idle(last_active):
+                session_log.end_session(session_id)
+                continue
+            memory_manager.restore_session(session_id, messages, last_active)
+            count += 1
+
+        if self.snapshot_path.exists():
+            self.snapshot_path.unlink()
+        return count
+
+    def start_restore(self) -> threading.Thread:
+        """Restore sessions in the background so startup does not wait on it."""
+
+        def run():
+            try:
+                count = self.restore_sessions()
+                print(f"Restored {count} chat sessions")
+            except Exception as e:
+                print(f"Error restoring chat sessions: {e}")
+            finally:
+                memory_manager.end_restore()
 
-    def get_chat_history(self, session_id: str) -> list:
-        """Get chat history for a session."""
-        return memory_manager.get_chat_history(session_id)
+        memory_manager.begin_restore()
+        thread = threading.Thread(target=run, name="session-restore", daemon=True)
+        thread.start()
+        self._restore_thread = thread
+        return thread
 
 
-# Global chat service instance
-chat_service = ChatService()
+@lru_cache()
+def get_chat_service() -> ChatService:
+    """Get the shared chat service, creating it on first use."""
+    return ChatService()
@@ -1,12 +1,15 @@
+from backend.core.config import get_settings
 from backend.core.llm_client import get_llm_client
 from ai.chains.evaluation_chain import create_evaluation_chain
 from backend.services.case_loader import case_loader
 from backend.services.metrics_service import metrics_service
+from backend.services.session_log import session_log
 from backend.models.evaluation_result import (
     EvaluationScore,
     EvaluationResult,
     ConversationMetrics,
 )
+from functools import lru_cache
 from typing import List, Dict
 
 
@@ -14,7 +17,20 @@ class EvaluationService:
     """Service for evaluating student performance."""
 
     def __init__(self):
-        self.llm = get_llm_client()
+        self._llm = None
+
+    @property
+    def llm(self):
+        """LLM client, created on first use."""
+        if self._llm is None:
+            self._llm = get_llm_client(self.model_name)
+        return self._llm
+
+    @property
+    def model_name(self) -> str:
+        """Name of the model this service calls."""
+        settings = get_settings()
+        return settings.evaluator_model or settings.openai_model
 
     def evaluate_conversation(
         self, session_id: str, case_id: str, messages: List[Dict[str, str]]
@@ -30,6 +46,14 @@ class EvaluationService:
         Returns:
             EvaluationResult with scores and feedback
         """
+        result = self._evaluate(session_id, case_id, messages)
+        session_log.log_evaluation(session_id, case_id, result.model_dump())
+        return result
+
+    def _evaluate(
+        self, session_id: str, case_id: str, messages: List[Dict[str, str]]
+    ) -> EvaluationResult:
+        """Run the evaluation chain and build the result, including errors."""
         try:
             # Get case data
             case = case_loader.get_case(case_id)
@@ -125,5 +149,7 @@ class EvaluationService:
             )
 
 
-# Global evaluation service instance
-evaluation_service = EvaluationService()
+@lru_cache()
+def get_evaluation_service() -> EvaluationService:
+    """Get the shared evaluation service, creating it on first use."""
+    return EvaluationService()
@@ -0,0 +1,334 @@
+"""
+Durable, append-only log of chat transcripts and evaluations.
+
+Each live session gets its own JSONL file. Records are handed to a
+background writer thread that batches everything queued within one
+group-commit interval, appends it and fsyncs once per touched file, so
+callers never wait on disk. Ended sessions are compacted into a single
+(optionally gzip-compressed) JSON document in the ``ended`` directory.
+"""
+
+import atexit
+import gzip
+import hashlib
+import os
+import queue
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import orjson
+from backend.core.config import get_settings
+
+_SAFE_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+# Queue markers understood by the writer thread
+_STOP = object()
+
+
+class _Flush:
+    """Marker that is signalled once everything queued before it is durable."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class _End:
+    """Marker requesting compaction of a session after its records commit."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+
+
+class SessionLog:
+    """Append-only, per-session transcript and evaluation log."""
+
+    def __init__(
+        self,
+        log_dir: Optional[Path] = None,
+        commit_interval: float = 0.05,
+        compress_ended: bool = True,
+    ):
+        self.log_dir = (
+            Path(log_dir)
+            if log_dir
+            else Path(__file__).parent.parent / "data" / "sessions"
+        )
+        self.ended_dir = self.log_dir / "ended"
+        self.commit_interval = commit_interval
+        self.compress_ended = compress_ended
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Files whose tail was checked for a torn write; writer thread only
+        self._repaired: Set[Path] = set()
+
+    def _file_stem(self, session_id: str) -> str:
+        """Map a client-supplied session ID to a safe file name."""
+        if _SAFE_SESSION_ID.match(session_id):
+            return session_id
+        return hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+
+    def active_path(self, session_id: str) -> Path:
+        """Path of the JSONL file for a live session."""
+        return self.log_dir / f"{self._file_stem(session_id)}.jsonl"
+
+    def ended_path(self, session_id: str) -> Path:
+        """Path of the compacted document for an ended session."""
+        suffix = ".json.gz" if self.compress_ended else ".json"
+        return self.ended_dir / f"{self._file_stem(session_id)}{suffix}"
+
+    def _ensure_writer(self) -> None:
+        """Start the background writer on first use, or again if it died."""
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self.ended_dir.mkdir(parents=True, exist_ok=True)
+                self._writer = threading.Thread(
+                    target=self._run, name="session-log-writer", daemon=True
+                )
+                self._writer.start()
+
+    def append(self, session_id: str, record: Dict[str, Any]) -> None:
+        """Queue a record for a session without waiting for it to hit disk."""
+        self._ensure_writer()
+        record = {"session_id": session_id, "ts": time.time(), **record}
+        self._queue.put((session_id, record))
+
+    def log_turn(
+        self, session_id: str, case_id: str, message: str, response: str
+    ) -> None:
+        """Record one student message and the patient's reply."""
+        self.append(
+            session_id,
+            {
+                "type": "turn",
+                "case_id": case_id,
+                "user": message,
+                "assistant": response,
+            },
+        )
+
+    def log_evaluation(
+        self, session_id: str, case_id: str, result: Dict[str, Any]
+    ) -> None:
+        """Record an evaluation result."""
+        self.append(
+            session_id, {"type": "evaluation", "case_id": case_id, "result": result}
+        )
+
+    def end_session(self, session_id: str) -> None:
+        """Mark a session as ended and compact its log in the background."""
+        self.append(session_id, {"type": "end"})
+        self._queue.put(_End(session_id))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every record queued so far is durable on disk."""
+        if self._writer is None:
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self) -> None:
+        """Commit everything still queued and stop the writer."""
+        if self._writer is None:
+            return
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._writer = None
+
+    def read_session(self, session_id: str) -> List[Dict[str, Any]]:
+        """Read every durable record of a session, live or ended."""
+        records = []
+        path = self._existing_ended_path(session_id)
+        if path is not None:
+            records = self._read_ended(path)
+
+        # Turns after a session was ended and resumed follow its document
+        active = self.active_path(session_id)
+        if active.exists():
+            records.extend(self.read_records(active))
+        return records
+
+    @staticmethod
+    def read_records(path: Path) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the records of a session JSONL file.
+
+        Lines that do not decode, such as one torn by a crash mid-append,
+        are skipped so one bad write cannot hide the rest of the log.
+        """
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    print(f"Error reading session log {path.name}: skipping bad line")
+
+    def _other_ended_path(self, session_id: str) -> Path:
+        """Ended path under the opposite compression setting."""
+        suffix = ".json" if self.compress_ended else ".json.gz"
+        return self.ended_dir / f"{self._file_stem(session_id)}{suffix}"
+
+    def _run(self) -> None:
+        """Writer loop: gather one interval's worth of records, then commit."""
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.commit_interval
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            records: Dict[str, List[Dict[str, Any]]] = {}
+            flushes = []
+            ended = []
+            for item in batch:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, _Flush):
+                    flushes.append(item)
+                elif isinstance(item, _End):
+                    ended.append(item.session_id)
+                else:
+                    session_id, record = item
+                    records.setdefault(session_id, []).append(record)
+
+            for session_id, lines in records.items():
+                try:
+                    self._commit(session_id, lines)
+                except Exception as e:
+                    print(f"Error writing session log for {session_id}: {e}")
+
+            for session_id in ended:
+                try:
+                    self._compact(session_id)
+                except Exception as e:
+                    print(f"Error compacting session log for {session_id}: {e}")
+
+            for marker in flushes:
+                marker.done.set()
+
+    def _repair_tail(self, path: Path) -> None:
+        """Drop a partial last line left by a crash in the middle of an append."""
+        if path in self._repaired:
+            return
+        self._repaired.add(path)
+        if not path.exists():
+            return
+        with open(path, "r+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Walk back to the end of the last complete line
+            end = size
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline != -1:
+                    end = start + newline + 1
+                    break
+                end = start
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+        print(f"Repaired torn write at the end of session log {path.name}")
+
+    def _commit(self, session_id: str, records: List[Dict[str, Any]]) -> None:
+        """Append a batch of records to a session file and fsync it."""
+        active = self.active_path(session_id)
+        ended = self._existing_ended_path(session_id)
+        if (
+            ended is not None
+            and not active.exists()
+            and all(record["type"] == "evaluation" for record in records)
+        ):
+            # An evaluation of an already ended session belongs with its
+            # transcript, not in a new live file that replay would resurrect
+            self._append_ended(session_id, ended, records)
+            return
+
+        self._repair_tail(active)
+        with open(active, "ab") as f:
+            f.write(b"".join(orjson.dumps(record) + b"\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _existing_ended_path(self, session_id: str) -> Optional[Path]:
+        """Compacted document of a session, under either compression setting."""
+        for path in (self.ended_path(session_id), self._other_ended_path(session_id)):
+            if path.exists():
+                return path
+        return None
+
+    def _write_ended(self, target: Path, session_id: str, records: List) -> None:
+        """Atomically write a session's compacted document."""
+        document = orjson.dumps({"session_id": session_id, "records": records})
+        if target.suffix == ".gz":
+            document = gzip.compress(document)
+
+        tmp_path = target.with_name(target.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(document)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, target)
+
+    @staticmethod
+    def _read_ended(path: Path) -> List[Dict[str, Any]]:
+        """Records of a compacted document."""
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rb") as f:
+            return orjson.loads(f.read())["records"]
+
+    def _append_ended(
+        self, session_id: str, path: Path, records: List[Dict[str, Any]]
+    ) -> None:
+        """Add records to an ended session's compacted document."""
+        self._write_ended(path, session_id, self._read_ended(path) + records)
+
+    def _compact(self, session_id: str) -> None:
+        """Fold an ended session's JSONL file into its cold document."""
+        active = self.active_path(session_id)
+        if not active.exists():
+            return
+
+        # A session resumed after ending already has a document; keep its
+        # earlier turns and evaluation ahead of the new ones
+        records = self.read_session(session_id)
+        existing = self._existing_ended_path(session_id)
+        target = self.ended_path(session_id)
+        self._write_ended(target, session_id, records)
+        if existing is not None and existing != target:
+            existing.unlink()
+        active.unlink()
+
+
+def _create_session_log() -> SessionLog:
+    """Build the session log from application settings."""
+    settings = get_settings()
+    return SessionLog(
+        log_dir=settings.session_log_dir or None,
+        commit_interval=settings.session_log_commit_interval_ms / 1000,
+        compress_ended=settings.session_log_compress,
+    )
+
+
+# Global session log instance
+session_log = _create_session_log()
+atexit.register(session_log.close)
@@ -0,0 +1,48 @@
+"""
+Boot-time benchmark for CaseLoader on a synthetic case library.
+
+Usage:
+    python -m benchmarks.bench_case_loader [num_cases]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from backend.services.case_loader import CaseLoader
+from benchmarks.synthetic import write_case_library
+
+
+def time_ms(func) -> float:
+    """Time one call in milliseconds."""
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def main(num_cases: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        cases_dir = Path(tmp) / "cases"
+        write_case_library(cases_dir, num_cases)
+        snapshot = Path(tmp) / "cases.snapshot"
+
+        serial = time_ms(CaseLoader(cases_dir, snapshot).load_all_cases)
+        snapshot.unlink()
+        loader = CaseLoader(cases_dir, snapshot, workers=os.cpu_count() or 1)
+        parallel = time_ms(loader.build_snapshot)
+        warm = time_ms(CaseLoader(cases_dir, snapshot).load_all_cases)
+        for case_file in list(cases_dir.iterdir())[:10]:
+            os.utime(case_file)
+        touched = time_ms(CaseLoader(cases_dir, snapshot).load_all_cases)
+
+        print(f"cases:                 {num_cases}")
+        print(f"serial ingest:         {serial:9.1f} ms")
+        print(f"parallel build step:   {parallel:9.1f} ms")
+        print(f"snapshot (unchanged):  {warm:9.1f} ms")
+        print(f"snapshot (10 touched): {touched:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
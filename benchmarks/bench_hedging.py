@@ -0,0 +1,137 @@
+"""
+Chat-turn tail latency with and without hedging to a faster tier.
+
+Uses synthetic streaming chat models with heavy-tailed time to first
+token, so it runs offline.
+
+Usage:
+    python -m benchmarks.bench_hedging [turns]
+"""
+
+import asyncio
+import random
+import sys
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+from backend.core.hedging import HedgedInvoker, LatencyWindow
+
+# Streams currently open across all synthetic models
+in_flight = 0
+
+
+class SyntheticChatModel(SimpleChatModel):
+    """Streaming chat model whose first token arrives after a random delay."""
+
+    median_s: float
+    tail_probability: float = 0.0
+    tail_factor: float = 1.0
+    token_s: float = 0.002
+    tokens: int = 20
+
+    @property
+    def _llm_type(self) -> str:
+        return "synthetic"
+
+    def _first_token_delay(self) -> float:
+        delay = random.lognormvariate(0, 0.3) * self.median_s
+        if random.random() < self.tail_probability:
+            delay *= self.tail_factor
+        return delay
+
+    def _call(self, messages: List[BaseMessage], *args: Any, **kwargs: Any) -> str:
+        time.sleep(self._first_token_delay() + self.token_s * self.tokens)
+        return "word " * self.tokens
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._first_token_delay())
+        for _ in range(self.tokens):
+            yield ChatGenerationChunk(message=AIMessageChunk(content="word "))
+            time.sleep(self.token_s)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        global in_flight
+        in_flight += 1
+        try:
+            await asyncio.sleep(self._first_token_delay())
+            for _ in range(self.tokens):
+                yield ChatGenerationChunk(message=AIMessageChunk(content="word "))
+                await asyncio.sleep(self.token_s)
+        finally:
+            in_flight -= 1
+
+
+def run(
+    invoker: HedgedInvoker, primary, backup, turns: int
+) -> Tuple[LatencyWindow, int]:
+    """
+    Run turns 16 at a time and collect end-to-end latencies.
+
+    Returns:
+        Tuple of (latencies, streams still open once every turn returned)
+    """
+    latencies = LatencyWindow(size=turns)
+
+    async def turn(limit: asyncio.Semaphore) -> None:
+        async with limit:
+            start = time.monotonic()
+            await invoker.invoke("How have you been sleeping?", primary, backup)
+            latencies.observe(time.monotonic() - start)
+
+    async def main() -> int:
+        limit = asyncio.Semaphore(16)
+        await asyncio.gather(*(turn(limit) for _ in range(turns)))
+        return in_flight
+
+    return latencies, asyncio.run(main())
+
+
+def main(turns: int) -> None:
+    random.seed(7)
+    # Flagship model: usually fine, 5% of calls stall for 5x as long
+    primary = SyntheticChatModel(median_s=0.08, tail_probability=0.05, tail_factor=5.0)
+    backup = SyntheticChatModel(median_s=0.04)
+
+    # Warm the first-token window so hedging uses the p95 deadline
+    warm = HedgedInvoker(min_samples=20)
+    run(warm, primary, None, 50)
+
+    plain, _ = run(HedgedInvoker(), primary, None, turns)
+    hedger = HedgedInvoker(min_samples=20)
+    hedger.first_token = warm.first_token
+    hedged, open_streams = run(hedger, primary, backup, turns)
+
+    print(f"turns: {turns}")
+    print(f"{'':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, window in (("primary", plain), ("hedged", hedged)):
+        print(
+            f"{name:<10}"
+            + "".join(f" {window.quantile(q) * 1000:8.0f}" for q in (0.5, 0.95, 0.99))
+        )
+    stats = hedger.stats()
+    print(f"hedges fired: {stats['hedges_fired']}, wins: {stats['wins']}")
+    print(f"streams left open after the last turn: {open_streams}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
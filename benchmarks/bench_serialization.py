@@ -0,0 +1,128 @@
+"""
+Serialization CPU per request for the largest API payloads.
+
+Compares FastAPI's default JSONResponse against ORJSONResponse on the
+same routes and response models, using synthetic payloads.
+
+Usage:
+    python -m benchmarks.bench_serialization [requests]
+"""
+
+import sys
+import time
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.testclient import TestClient
+from langchain.schema import AIMessage, HumanMessage
+
+from backend.models.case import Case
+from backend.models.evaluation_result import (
+    ConversationMetrics,
+    EvaluationResult,
+    EvaluationScore,
+)
+
+
+def synthetic_cases(num_cases: int = 200) -> List[Case]:
+    """Build a case list similar in size to a real library."""
+    return [
+        Case(
+            id=f"case_{i:04d}",
+            patient_name=f"Patient {i}",
+            age=20 + i % 60,
+            gender="Female",
+            chief_complaint="Low mood and poor sleep",
+            condition="Major Depressive Disorder",
+            background="Works full time and lives with family. " * 8,
+            symptoms="Low mood, anhedonia, early waking, fatigue. " * 12,
+            medical_history="No previous psychiatric treatment. " * 6,
+            expected_questions=[f"Question {q}?" for q in range(10)],
+        )
+        for i in range(num_cases)
+    ]
+
+
+def synthetic_history(turns: int = 200) -> list:
+    """Build a long LangChain message history."""
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"How has your sleep been lately? {i}"))
+        messages.append(AIMessage(content="I wake up at 4am most nights. " * 4))
+    return messages
+
+
+def synthetic_evaluation() -> EvaluationResult:
+    """Build an evaluation result with full feedback."""
+    return EvaluationResult(
+        session_id="session",
+        case_id="case_0000",
+        scores=EvaluationScore(
+            rapport_building=7,
+            active_listening_empathy=8,
+            psychiatric_history=6,
+            risk_assessment=5,
+            biopsychosocial_assessment=7,
+            communication_skills=8,
+            cultural_sensitivity=6,
+            interview_structure=7,
+            overall_score=6.8,
+        ),
+        strengths=["Warm opening and clear introduction"] * 5,
+        areas_for_improvement=["Ask directly about suicidal ideation"] * 5,
+        feedback="Good rapport overall, but risk assessment was incomplete. " * 20,
+        metrics=ConversationMetrics(
+            information_density=0.12,
+            emotional_tendency=0.5,
+            response_length=11.2,
+            turn_number=40,
+        ),
+    )
+
+
+def build_app(response_class) -> FastAPI:
+    """Build an app serving the benchmark payloads."""
+    app = FastAPI(default_response_class=response_class)
+    cases = synthetic_cases()
+    history = synthetic_history()
+    evaluation = synthetic_evaluation()
+
+    @app.get("/cases", response_model=List[Case])
+    async def get_cases():
+        return cases
+
+    @app.get("/history")
+    async def get_history():
+        return {"session_id": "session", "messages": history}
+
+    @app.get("/evaluate", response_model=EvaluationResult)
+    async def get_evaluation():
+        return evaluation
+
+    return app
+
+
+def cpu_per_request(client: TestClient, path: str, requests: int) -> float:
+    """Measure process CPU time per request in microseconds."""
+    client.get(path)
+    start = time.process_time()
+    for _ in range(requests):
+        client.get(path)
+    return (time.process_time() - start) / requests * 1e6
+
+
+def main(requests: int) -> None:
+    clients = {
+        "json": TestClient(build_app(JSONResponse)),
+        "orjson": TestClient(build_app(ORJSONResponse)),
+    }
+    print(f"{'endpoint':<10} {'json us':>10} {'orjson us':>10} {'speedup':>8}")
+    for path in ("/cases", "/history", "/evaluate"):
+        before = cpu_per_request(clients["json"], path, requests)
+        after = cpu_per_request(clients["orjson"], path, requests)
+        print(f"{path:<10} {before:10.0f} {after:10.0f} {before / after:7.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
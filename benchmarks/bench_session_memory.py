@@ -0,0 +1,113 @@
+"""
+Memory benchmark for live chat sessions.
+
+Compares bytes per session of the old layout, a ConversationBufferMemory
+plus a ConversationChain with its own rendered persona prompt per session,
+with the compact message records and per-case shared prompt used now.
+
+Usage:
+    python -m benchmarks.bench_session_memory [num_sessions] [turns]
+"""
+
+import gc
+import sys
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from ai.chains.patient_chain import create_patient_prompt
+from ai.memory.conversation_memory import ConversationMemoryManager
+from benchmarks.synthetic import PATIENT_LINES, STUDENT_LINES, make_case
+
+NUM_CASES = 10
+
+
+def make_turns(session: int, turns: int) -> List[tuple]:
+    """Distinct (message, response) pairs, as real students would send."""
+    return [
+        (
+            f"{STUDENT_LINES[turn % len(STUDENT_LINES)]} ({session}.{turn})",
+            f"{PATIENT_LINES[turn % len(PATIENT_LINES)]} ({session}.{turn})",
+        )
+        for turn in range(turns)
+    ]
+
+
+def create_patient_chain(llm, memory, case_data: Dict[str, Any]):
+    """The per-session ConversationChain the app used to build."""
+    from langchain.chains import ConversationChain
+
+    return ConversationChain(
+        llm=llm, memory=memory, prompt=create_patient_prompt(case_data), verbose=False
+    )
+
+
+def build_chains(num_sessions: int, turns: int) -> list:
+    """Old layout: one memory and one chain per session."""
+    from langchain.memory import ConversationBufferMemory
+    from langchain_community.chat_models.fake import FakeListChatModel
+
+    llm = FakeListChatModel(responses=["..."])
+    cases = [make_case(i) for i in range(NUM_CASES)]
+    chains = []
+    for session in range(num_sessions):
+        memory = ConversationBufferMemory(
+            memory_key="chat_history",
+            return_messages=True,
+            input_key="input",
+            output_key="output",
+        )
+        for message, response in make_turns(session, turns):
+            memory.save_context({"input": message}, {"output": response})
+        chains.append(
+            create_patient_chain(
+                llm=llm, memory=memory, case_data=cases[session % NUM_CASES]
+            )
+        )
+    return chains
+
+
+def build_compact(num_sessions: int, turns: int) -> tuple:
+    """New layout: message records per session, one prompt per case."""
+    prompts = [create_patient_prompt(make_case(i)) for i in range(NUM_CASES)]
+    memories = ConversationMemoryManager()
+    for session in range(num_sessions):
+        for message, response in make_turns(session, turns):
+            memories.add_turn(f"session-{session}", message, response)
+    return prompts, memories
+
+
+def bytes_per_session(build: Callable, num_sessions: int, turns: int) -> float:
+    """Traced bytes still allocated after building the sessions."""
+    # Warm up imports and caches so they are not counted
+    build(2, 1)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = build(num_sessions, turns)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del sessions
+    return (after - before) / num_sessions
+
+
+def main(num_sessions: int, turns: int) -> None:
+    content = sum(
+        len(message) + len(response)
+        for message, response in make_turns(num_sessions // 2, turns)
+    )
+    old = bytes_per_session(build_chains, num_sessions, turns)
+    new = bytes_per_session(build_compact, num_sessions, turns)
+
+    print(f"sessions:              {num_sessions} ({turns} turns each)")
+    print(f"message text:          {content:9.0f} B/session")
+    print(f"buffer memory + chain: {old:9.0f} B/session")
+    print(f"compact records:       {new:9.0f} B/session")
+    print(f"sessions per GB:       {2**30 / old:9.0f} -> {2**30 / new:.0f}")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10,
+    )
@@ -0,0 +1,72 @@
+"""
+Cold-import budget check for the API entry point.
+
+Imports backend.main in fresh interpreters and fails (exit code 1) if the
+best cold import exceeds the budget, or if any LLM library was pulled onto
+the startup path.
+
+Usage:
+    python -m benchmarks.check_import_time [budget_ms]
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ENTRY_MODULE = "backend.main"
+DEFAULT_BUDGET_MS = 600
+RUNS = 5
+
+# Only needed once an LLM call is made, never at startup
+DEFERRED_MODULES = ("langchain", "langchain_openai", "langchain_core", "openai")
+
+PROBE = f"""
+import sys, time
+start = time.perf_counter()
+import {ENTRY_MODULE}
+elapsed = (time.perf_counter() - start) * 1000
+loaded = sorted(
+    name for name in {DEFERRED_MODULES!r}
+    if name in sys.modules
+)
+print(elapsed)
+print(",".join(loaded))
+"""
+
+
+def measure() -> tuple:
+    """Import the entry module in a fresh interpreter."""
+    # No API key: the app must be importable offline
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=Path(__file__).parent.parent,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.splitlines()
+    loaded = output[1].split(",") if len(output) > 1 and output[1] else []
+    return float(output[0]), loaded
+
+
+def main(budget_ms: float) -> int:
+    results = [measure() for _ in range(RUNS)]
+    best = min(elapsed for elapsed, _ in results)
+    loaded = results[0][1]
+
+    print(f"cold import of {ENTRY_MODULE}: {best:.1f} ms (budget {budget_ms:.0f} ms)")
+
+    failed = False
+    if best > budget_ms:
+        print("FAIL: cold import is over budget")
+        failed = True
+    if loaded:
+        print(f"FAIL: imported at startup: {', '.join(loaded)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS))
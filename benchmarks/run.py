@@ -0,0 +1,225 @@
+"""
+Microbenchmark suite for the CPU-side per-request hot paths.
+
+Runs offline on synthetic data, prints machine-readable JSON results and
+compares them with a stored baseline. Exits with code 1 if any benchmark's
+best time is slower than its baseline by more than the threshold; the
+best of several repeats is far less noisy than the median.
+
+Usage:
+    python -m benchmarks.run                      # run and compare
+    python -m benchmarks.run --save-baseline      # record a new baseline
+    python -m benchmarks.run --quick --output results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from ai.chains.evaluation_chain import format_transcript, parse_evaluation_result
+from ai.chains.patient_chain import create_patient_prompt
+from ai.memory.conversation_memory import ConversationMemoryManager
+from backend.services.case_loader import CaseLoader
+from backend.services.metrics_service import MetricsService
+from benchmarks import synthetic
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+DEFAULT_THRESHOLD = 0.25
+
+# Smallest wall time for one repeat of a fast benchmark
+MIN_REPEAT_TIME = 0.05
+
+
+def time_fast(func: Callable[[], Any], repeat: int) -> List[float]:
+    """Per-call seconds for each repeat, looping so each repeat is measurable."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - start >= MIN_REPEAT_TIME:
+            break
+        loops *= 2
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+    return samples
+
+
+def time_with_setup(
+    func: Callable[[Any], Any], setup: Callable[[], Any], repeat: int
+) -> List[float]:
+    """Seconds for one call per repeat, excluding a fresh untimed setup."""
+    samples = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        func(arg)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Median and min in microseconds."""
+    return {
+        "median_us": round(statistics.median(samples) * 1e6, 2),
+        "min_us": round(min(samples) * 1e6, 2),
+        "repeat": len(samples),
+    }
+
+
+def bench_metrics(results: Dict, repeat: int) -> None:
+    service = MetricsService()
+    for name, turns in (("short", 5), ("long", 200)):
+        messages = synthetic.make_conversation(turns)
+        results[f"metrics.calculate_all_metrics.{name}"] = summarize(
+            time_fast(lambda: service.calculate_all_metrics(messages), repeat)
+        )
+
+
+def bench_transcript(results: Dict, repeat: int) -> None:
+    for name, turns in (("short", 5), ("long", 200)):
+        messages = synthetic.make_conversation(turns)
+        results[f"evaluation.format_transcript.{name}"] = summarize(
+            time_fast(lambda: format_transcript(messages), repeat)
+        )
+
+
+def bench_evaluation_parse(results: Dict, repeat: int) -> None:
+    reply = synthetic.make_evaluation_reply()
+    results["evaluation.parse_result"] = summarize(
+        time_fast(lambda: parse_evaluation_result(reply), repeat)
+    )
+
+
+def bench_patient_prompt(results: Dict, repeat: int) -> None:
+    case_data = synthetic.make_case(0)
+    results["patient_prompt.create"] = summarize(
+        time_fast(lambda: create_patient_prompt(case_data), repeat)
+    )
+
+    prompt = create_patient_prompt(case_data)
+    memories = ConversationMemoryManager()
+    for message in synthetic.make_conversation(20)[::2]:
+        memories.add_turn("session", message["content"], "I'm not sure.")
+    results["patient_prompt.render.20_turns"] = summarize(
+        time_fast(
+            lambda: prompt.format_prompt(
+                chat_history=memories.get_chat_history("session"),
+                input="How are you feeling today?",
+            ),
+            repeat,
+        )
+    )
+
+
+def bench_case_loader(results: Dict, repeat: int, sizes: List[int]) -> None:
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            cases_dir = Path(tmp) / "cases"
+            snapshot = Path(tmp) / "cases.snapshot"
+            synthetic.write_case_library(cases_dir, size)
+            # Small libraries are cheap but noisy, large ones slow but steady
+            runs = repeat * 4 if size <= 100 else repeat if size < 10000 else 2
+
+            def cold_loader() -> CaseLoader:
+                snapshot.unlink(missing_ok=True)
+                return CaseLoader(cases_dir, snapshot, workers=os.cpu_count() or 1)
+
+            results[f"case_loader.build_snapshot.{size}"] = summarize(
+                time_with_setup(
+                    lambda loader: loader.build_snapshot(), cold_loader, runs
+                )
+            )
+
+            CaseLoader(cases_dir, snapshot).build_snapshot()
+            results[f"case_loader.load_all_cases.snapshot.{size}"] = summarize(
+                time_with_setup(
+                    lambda loader: loader.load_all_cases(),
+                    lambda: CaseLoader(cases_dir, snapshot),
+                    runs,
+                )
+            )
+
+
+def run_suite(quick: bool, repeat: int) -> Dict[str, Any]:
+    """Run every benchmark and return results keyed by benchmark name."""
+    results: Dict[str, Dict[str, float]] = {}
+    bench_metrics(results, repeat)
+    bench_transcript(results, repeat)
+    bench_evaluation_parse(results, repeat)
+    bench_patient_prompt(results, repeat)
+    sizes = [10, 100, 1000] if quick else [10, 100, 1000, 10000]
+    bench_case_loader(results, repeat, sizes)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+        },
+        "benchmarks": results,
+    }
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Names and ratios of benchmarks slower than baseline beyond the threshold."""
+    regressions = []
+    for name, result in current["benchmarks"].items():
+        reference = baseline["benchmarks"].get(name)
+        if reference is None:
+            continue
+        ratio = result["min_us"] / reference["min_us"]
+        if ratio > 1 + threshold:
+            regressions.append(f"{name}: {ratio:.2f}x baseline")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="skip 10k-case runs")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store results as the baseline"
+    )
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.quick, args.repeat)
+    output = json.dumps(current, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+    if args.save_baseline:
+        args.baseline.write_text(output + "\n", encoding="utf-8")
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, skipping comparison", file=sys.stderr)
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare(current, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
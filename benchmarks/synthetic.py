@@ -0,0 +1,82 @@
+"""
+Synthetic data generators for offline benchmarks.
+"""
+
+import json
+import random
+from pathlib import Path
+from typing import Any, Dict, List
+
+STUDENT_LINES = [
+    "Thank you for coming in today. How have you been feeling lately?",
+    "Can you tell me more about your sleep and appetite?",
+    "Have you had any thoughts of harming yourself or suicidal thoughts?",
+    "I understand this is difficult. Is there any family history of depression?",
+    "How much alcohol do you drink in a typical week?",
+    "Are you taking any medication or have you had therapy before?",
+    "What kind of support do you have at home?",
+]
+
+PATIENT_LINES = [
+    "I've been feeling really low for a few months now, nothing seems fun.",
+    "I wake up around 4am and can't get back to sleep. I'm not hungry much.",
+    "Sometimes I think everyone would be better off without me, but I have no plan.",
+    "My mother had depression, she was in hospital once when I was a kid.",
+    "Maybe a few glasses of wine most nights, it helps me switch off.",
+    "No, I've never seen anyone about this before.",
+    "My partner tries, but I don't really talk to anyone about it.",
+]
+
+
+def make_case(index: int) -> Dict[str, Any]:
+    """Build one case dictionary shaped like the files in data/cases."""
+    return {
+        "id": f"synthetic_case_{index:05d}",
+        "patient_name": f"Patient {index}",
+        "age": 20 + index % 60,
+        "gender": "Female" if index % 2 else "Male",
+        "chief_complaint": "Low mood and poor sleep",
+        "condition": "Major Depressive Disorder",
+        "background": "Works full time and lives with family. " * 8,
+        "symptoms": "Low mood, anhedonia, early waking, fatigue. " * 12,
+        "medical_history": "No previous psychiatric treatment. " * 6,
+        "difficulty_level": ("easy", "medium", "hard")[index % 3],
+        "expected_questions": [f"Question {q}?" for q in range(10)],
+    }
+
+
+def write_case_library(cases_dir: Path, num_cases: int) -> None:
+    """Write a directory of synthetic case files."""
+    cases_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(num_cases):
+        with open(cases_dir / f"case_{i:05d}.json", "w", encoding="utf-8") as f:
+            json.dump(make_case(i), f)
+
+
+def make_conversation(turns: int, seed: int = 0) -> List[Dict[str, str]]:
+    """Build a conversation of student/patient message pairs."""
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(turns):
+        messages.append({"role": "user", "content": rng.choice(STUDENT_LINES)})
+        messages.append({"role": "assistant", "content": rng.choice(PATIENT_LINES)})
+    return messages
+
+
+def make_evaluation_reply() -> str:
+    """Build an evaluator reply as the LLM returns it, inside a json fence."""
+    evaluation = {
+        "rapport_building": 7,
+        "active_listening_empathy": 8,
+        "psychiatric_history": 6,
+        "risk_assessment": 5,
+        "biopsychosocial_assessment": 7,
+        "communication_skills": 8,
+        "cultural_sensitivity": 6,
+        "interview_structure": 7,
+        "overall_score": 6.8,
+        "strengths": ["Warm opening and clear introduction"] * 4,
+        "areas_for_improvement": ["Ask directly about suicidal ideation"] * 4,
+        "feedback": "Good rapport overall, but risk assessment was incomplete. " * 10,
+    }
+    return "```json\n" + json.dumps(evaluation, indent=2) + "\n```"